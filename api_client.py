@@ -1,40 +1,445 @@
 # api_client.py
-import requests
 import os
+import json
+import time
 import math
-import pandas as pd
-import re
-from settings import API_LIMIT
+import random
+import itertools
+import threading
+from collections import deque
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from settings import API_LIMIT, API_WORKERS, PLAN_PER_VALUE, TOKEN_REFRESH_MARGIN, DB_MAX_AGE, STREAM_READ_BYTES, STREAM_DECODE
+from settings import RESISTOR_SERIES, CAPACITOR_SERIES
+from settings import API_RATE_PER_MINUTE, API_MAX_RETRIES, API_BACKOFF_BASE, API_BACKOFF_MAX
+from cache import ResponseCache
+from selection import CheapestSelector
+from values import parseValue, parseValues, seriesKeys, seriesIndex, INVALID_KEY
+from metrics import metrics
+from records import ProductRecord, parameterValue
+from jsonstream import decodePage, loadPage, loads
 
 # Digikey Credentials
 client_id = os.getenv("DIGIKEY_CLIENT_ID")
 client_secret = os.getenv("DIGIKEY_CLIENT_SECRET")
 
-# Digikey API Targets
-targetKeywordSearch = "https://api.digikey.com/products/v4/search/keyword"
+# Digikey API Targets, DIGIKEY_API_BASE points them at another server such as fake_digikey.py
+apiBase = os.getenv("DIGIKEY_API_BASE", "https://api.digikey.com").rstrip("/")
+targetToken = f"{apiBase}/v1/oauth2/token"
+targetKeywordSearch = f"{apiBase}/products/v4/search/keyword"
+targetProductDetails = f"{apiBase}/products/v4/search/{{}}/productdetails"
+
+# Response cache shared by all searches, see configureCache()
+responseCache = None
+
+def configureCache(folder, ttl, max_bytes, offline=False):
+  """
+  Put an on-disk response cache in front of every keyword search.
+  In offline mode a cache miss raises instead of touching the network.
+  """
+  global responseCache
+  responseCache = ResponseCache(folder, ttl, max_bytes, offline, scope=[apiBase, client_id])
+  return responseCache
+
+def _intHeader(headers, name):
+  """Integer value of a response header, None if missing or not a number"""
+  try:
+    return int(headers.get(name))
+  except (TypeError, ValueError):
+    return None
+
+class RequestScheduler:
+  """Paces API calls to DigiKey's rate limits and backs off failed ones"""
+  def __init__(self, per_minute=API_RATE_PER_MINUTE, max_retries=API_MAX_RETRIES,
+               backoff_base=API_BACKOFF_BASE, backoff_max=API_BACKOFF_MAX):
+    self.rate = per_minute / 60.0
+    self.capacity = float(per_minute)
+    self.tokens = self.capacity
+    self.max_retries = max_retries
+    self.backoff_base = backoff_base
+    self.backoff_max = backoff_max
+    self.daily_limit = None
+    self.daily_remaining = None
+    self.retries = 0
+    self._updated = time.monotonic()
+    self._paused_until = 0.0
+    self._lock = threading.Lock()
+
+  def acquire(self):
+    """Block until the next call may be sent"""
+    while True:
+      with self._lock:
+        if self.daily_remaining == 0:
+          raise RuntimeError("DigiKey daily request quota is used up, try again tomorrow")
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        wait = self._paused_until - now
+        if wait <= 0:
+          if self.tokens >= 1:
+            self.tokens -= 1
+            return
+          wait = (1 - self.tokens) / self.rate
+      time.sleep(wait)
+
+  def wait(self):
+    """Block while calls are paused after a 429, without taking a token"""
+    with self._lock:
+      wait = self._paused_until - time.monotonic()
+    if wait > 0:
+      time.sleep(wait)
+
+  def update(self, headers):
+    """Sync the bucket and daily budget with the rate limit headers of a response"""
+    burstLimit = _intHeader(headers, "X-BurstLimit-Limit")
+    burstRemaining = _intHeader(headers, "X-BurstLimit-Remaining")
+    burstReset = _intHeader(headers, "X-BurstLimit-Reset")
+    dailyLimit = _intHeader(headers, "X-RateLimit-Limit")
+    dailyRemaining = _intHeader(headers, "X-RateLimit-Remaining")
+
+    with self._lock:
+      if burstLimit:
+        self.rate = burstLimit / 60.0
+        self.capacity = float(burstLimit)
+      if burstRemaining is not None:
+        self.tokens = min(self.tokens, burstRemaining)
+        if burstRemaining == 0 and burstReset:
+          self._paused_until = max(self._paused_until, time.monotonic() + burstReset)
+      if dailyLimit is not None:
+        self.daily_limit = dailyLimit
+      if dailyRemaining is not None:
+        self.daily_remaining = dailyRemaining
+
+  def backoff(self, attempt, retry_after=None, pause_all=False):
+    """
+    Wait before retry number `attempt`. Uses Retry-After when the server sent
+    one, otherwise a full-jitter exponential delay. A 429 pauses every worker,
+    other failures only delay the calling one.
+    """
+    if retry_after is not None:
+      delay = min(retry_after, self.backoff_max)
+    else:
+      delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    with self._lock:
+      self.retries += 1
+      if pause_all:
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return
+    time.sleep(delay)
+
+  def report(self):
+    """Human readable summary of the remaining daily budget"""
+    if self.daily_remaining is None:
+      return f"Daily API budget unknown, {self.retries} retries"
+    return f"Daily API budget: {self.daily_remaining} of {self.daily_limit} calls left, {self.retries} retries"
+
+class DigiKeyClient:
+  """
+  Authenticated DigiKey API client shared by every request of a run, with one
+  pooled session and an access token that is refreshed before it expires.
+  """
+  def __init__(self, workers=API_WORKERS, token_file=None, scheduler=None, stream_decode=STREAM_DECODE):
+    self.token_file = token_file
+    self.scheduler = scheduler or RequestScheduler()
+    self.workers = workers
+    self.stream_decode = stream_decode
+    self._session = None
+    self._sessionLock = threading.Lock()
+    self._token = None
+    self._expires_at = 0.0
+    self._lock = threading.Lock()
+    self._loadTokenFile()
+
+  @property
+  def session(self):
+    with self._sessionLock:
+      if self._session is None:
+        import requests
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, self.workers))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+      return self._session
+
+  def _loadTokenFile(self):
+    if not self.token_file or not os.path.exists(self.token_file):
+      return
+    try:
+      with open(self.token_file, "r", encoding="utf-8") as file:
+        saved = json.load(file)
+    except (OSError, ValueError):
+      return
+    if saved.get("client_id") == client_id:
+      self._token = saved.get("access_token")
+      self._expires_at = float(saved.get("expires_at", 0))
+
+  def _saveTokenFile(self):
+    if not self.token_file:
+      return
+    saved = {"client_id": client_id, "access_token": self._token, "expires_at": self._expires_at}
+    try:
+      fd = os.open(self.token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+      os.chmod(self.token_file, 0o600)
+      with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump(saved, file)
+    except OSError as e:
+      print(f"Could not write token file {self.token_file}. Error: {e}")
+
+  def _request(self, method, url, paced=True, **kwargs):
+    """
+    Send one request through the scheduler. 429, 5xx and connection errors are retried
+    up to max_retries times, any other response is returned to the caller.
+    Unpaced requests skip the token bucket but still wait out a 429 pause.
+    """
+    import requests
+    scheduler = self.scheduler
+    for attempt in range(scheduler.max_retries + 1):
+      lastTry = attempt == scheduler.max_retries
+      if paced:
+        scheduler.acquire()
+      else:
+        scheduler.wait()
+      try:
+        with metrics.stage("http") as stage:
+          response = self.session.request(method, url, **kwargs)
+          if not kwargs.get("stream"):
+            stage["bytes"] = len(response.content)
+      except (requests.ConnectionError, requests.Timeout) as e:
+        if lastTry:
+          raise RuntimeError(f"API request to {url} failed: {e}") from e
+        print(f"Connection error, retrying: {e}")
+        scheduler.backoff(attempt)
+        continue
+
+      scheduler.update(response.headers)
+      if (response.status_code == 429 or response.status_code >= 500) and not lastTry:
+        print(f"API returned {response.status_code}, retrying")
+        response.close()
+        scheduler.backoff(attempt, _intHeader(response.headers, "Retry-After"), pause_all=response.status_code == 429)
+        continue
+      return response
+
+  def _requestToken(self):
+    headers = {"content-type": "application/x-www-form-urlencoded"}
+    payload = {
+      "client_id": client_id,
+      "client_secret": client_secret,
+      "grant_type": "client_credentials"
+    }
+
+    with metrics.stage("auth"):
+      response = self._request("POST", targetToken, paced=False, data=payload, headers=headers)
+    if response.status_code != 200:
+      raise RuntimeError(f"Token request failed: {response.text}")
+
+    responseData = response.json()
+    self._token = responseData['access_token']
+    self._expires_at = time.time() + float(responseData.get('expires_in', 0))
+    self._saveTokenFile()
+
+  def token(self, stale=None):
+    """
+    Current access token. Requests a new one when there is none, when it is
+    about to expire, or when `stale` is the token the API just rejected.
+    Only the first worker to report a stale token asks for a new one.
+    """
+    with self._lock:
+      if self._token is None or self._token == stale or time.time() > self._expires_at - TOKEN_REFRESH_MARGIN:
+        self._requestToken()
+      return self._token
+
+  def _authorized(self, method, url, **kwargs):
+    """
+    Send an API request with the access token, refreshing it when it was
+    revoked, up to max_retries times
+    """
+    token = self.token()
+    headers = {
+      "x-digikey-client-id": client_id,
+      "content-type": "application/json",
+      "authorization": f"Bearer {token}"
+    }
+
+    for attempt in range(self.scheduler.max_retries + 1):
+      response = self._request(method, url, headers=headers, **kwargs)
+      if response.status_code != 401 or attempt == self.scheduler.max_retries:
+        return response
+
+      # Token revoked before its expiry, possibly again while other workers refreshed it
+      response.close()
+      token = self.token(stale=token)
+      headers["authorization"] = f"Bearer {token}"
+
+  def keywordSearch(self, payload, transform=None):
+    """
+    Post one keyword search and return the decoded response.
+    Answers from the response cache when one is configured.
+    With `transform`, every product goes through `transform`. With
+    stream_decode set as well, a fetched body is decoded incrementally while
+    it is read, so the full page tree is never built.
+    """
+    start = time.perf_counter()
+    offset = int(payload.get("Offset", 0))
+    if responseCache is not None:
+      with metrics.stage("cache"):
+        cached = responseCache.getRaw(payload)
+      if cached is not None:
+        with metrics.stage("json") as stage:
+          responseData = loadPage(cached, transform)
+          stage["bytes"] = len(cached)
+        metrics.page(offset=offset, seconds=time.perf_counter() - start, bytes=0, cached=True)
+        return responseData
+
+    stream = transform is not None and self.stream_decode
+    response = self._authorized("POST", targetKeywordSearch, json=payload, stream=stream)
+    if response.status_code != 200:
+      raise RuntimeError(f"API request failed {response.status_code}: {response.text}")
+
+    if stream:
+      responseData, content, received = self._decodeStream(response, transform, keep=responseCache is not None)
+    else:
+      with metrics.stage("json") as stage:
+        content = response.content
+        responseData = loadPage(content, transform)
+        stage["bytes"] = received = len(content)
+    if responseCache is not None:
+      with metrics.stage("cache"):
+        responseCache.put(payload, content)
+    metrics.page(offset=offset, seconds=time.perf_counter() - start, bytes=received, cached=False)
+    return responseData
+
+  @staticmethod
+  def _decodeStream(response, transform, keep=False):
+    """
+    Decode a streamed response body while it is read. Reading the body counts
+    as http, only the decoder time as json. The raw body is only kept, and
+    returned, when `keep` is set, otherwise None is returned in its place.
+    Returns (decoded page, raw body, bytes received).
+    """
+    chunks = [] if keep else None
+    received = 0
+    network = 0.0
+    def body():
+      nonlocal received, network
+      reader = response.iter_content(STREAM_READ_BYTES)
+      while True:
+        started = time.perf_counter()
+        chunk = next(reader, None)
+        network += time.perf_counter() - started
+        if chunk is None:
+          return
+        received += len(chunk)
+        if keep:
+          chunks.append(chunk)
+        yield chunk
+
+    started = time.perf_counter()
+    responseData = decodePage(body(), transform)
+    decoding = time.perf_counter() - started - network
+    metrics.add("http", network, received, calls=0)
+    metrics.add("json", decoding, received)
+    return responseData, b"".join(chunks) if keep else None, received
+
+  def productDetails(self, partNumber):
+    """
+    Current details of one DigiKey part number, including pricing and
+    stock, or None if DigiKey does not know the part.
+    Answers from the response cache when one is configured.
+    """
+    key = {"ProductDetails": partNumber}
+    if responseCache is not None:
+      cached = responseCache.get(key)
+      if cached is not None:
+        return cached.get("Product")
+
+    url = targetProductDetails.format(quote(partNumber, safe=""))
+    response = self._authorized("GET", url)
+    if response.status_code == 404:
+      return None
+    if response.status_code != 200:
+      raise RuntimeError(f"API request failed {response.status_code}: {response.text}")
+
+    responseData = loads(response.content)
+    if responseCache is not None:
+      responseCache.put(key, response.content)
+    return responseData.get("Product")
+
+# Client shared by all fetchers, see configureClient()
+apiClient = None
+
+def configureClient(workers=API_WORKERS, token_file=None, per_minute=API_RATE_PER_MINUTE, stream_decode=STREAM_DECODE):
+  """Create the shared client, sizing its connection pool for `workers`"""
+  global apiClient
+  apiClient = DigiKeyClient(workers, token_file, RequestScheduler(per_minute), stream_decode)
+  return apiClient
+
+def getClient():
+  """Shared client, created with default settings on first use"""
+  if apiClient is None:
+    configureClient()
+  return apiClient
 
 def getToken():
-  target = "https://api.digikey.com/v1/oauth2/token"
-  headers = {"content-type": "application/x-www-form-urlencoded"}
-  payload = {
-    "client_id": client_id,
-    "client_secret": client_secret,
-    "grant_type": "client_credentials"
-  }
+  return getClient().token()
 
-  response = requests.post(target, data=payload, headers=headers)
-  if response.status_code == 200:
-    return response.json()['access_token']
-  else:
-    raise RuntimeError(f"Token request failed: {response.text}")
+def _iterPages(getBatch, filterValue, user_limit, workers, label, transform=None):
+  """
+  Yield every page of a search in offset order. The first page gives
+  ProductsCount, so the remaining offsets are known and are fetched by a
+  bounded pool of workers that runs at most two pages per worker ahead of
+  the consumer.
+  """
+  client = getClient()
 
-def _getThroughholeResistorBatch(token, power_id, limit, offset):
-  """Internal helper to get a single batch"""
-  
-  payload = {
+  print(f"Getting batch number 1 for {label}")
+  first = getBatch(client, filterValue, user_limit, 0, transform)
+  totalCount = first.get("ProductsCount", 0)
+  print(f"Found {totalCount} products")
+  yield first
+
+  offsets = iter(range(user_limit, totalCount, user_limit))
+  numOfBatches = math.ceil(totalCount / user_limit) if totalCount else 1
+  workers = max(1, workers)
+
+  with ThreadPoolExecutor(max_workers=workers) as pool:
+    pending = deque(pool.submit(getBatch, client, filterValue, user_limit, offset, transform)
+                    for offset in itertools.islice(offsets, 2 * workers))
+    index = 1
+    while pending:
+      with metrics.stage("fetch wait"):
+        page = pending.popleft().result()
+      offset = next(offsets, None)
+      if offset is not None:
+        pending.append(pool.submit(getBatch, client, filterValue, user_limit, offset, transform))
+      index += 1
+      print(f"Got batch {index} of {numOfBatches}")
+      yield page
+
+  if responseCache is not None:
+    print(f"Cache: {responseCache.hits} hits, {responseCache.misses} misses")
+  print(client.scheduler.report())
+
+def fetch_product_details(partNumbers, workers=API_WORKERS):
+  """
+  Look up many DigiKey part numbers, `workers` at a time. Duplicates are
+  fetched once. Returns part number -> product, None for unknown parts.
+  """
+  client = getClient()
+  unique = list(dict.fromkeys(partNumbers))
+  print(f"Looking up {len(unique)} part numbers")
+  with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+    details = dict(zip(unique, pool.map(client.productDetails, unique)))
+
+  if responseCache is not None:
+    print(f"Cache: {responseCache.hits} hits, {responseCache.misses} misses")
+  print(client.scheduler.report())
+  return details
+
+def resistorSearch(power_id):
+  """Keyword search of 5% through hole resistors of one power rating, without Limit and Offset"""
+  return {
     "Keywords": "resistor",
-    "Limit": f"{limit}",
-    "Offset": f"{offset}",
     "MinimumQuantityAvailable": 1,
     "FilterOptionsRequest": {
       "CategoryFilter": [{"id": "2"}],
@@ -51,120 +456,196 @@ def _getThroughholeResistorBatch(token, power_id, limit, offset):
     "ExcludedContent": ["FilterOptions"],
     "SortOptions": {"Field": "Price", "SortOrder": "Ascending"}
   }
-  headers = {
-    "x-digikey-client-id": client_id,
-    "content-type": "application/json",
-    "authorization": f"Bearer {token}"
-  }
-  
-  response = requests.post(targetKeywordSearch, json=payload, headers=headers)
-  
-  # Handle token refresh if 401
-  if response.status_code == 401:
-    new_token = getToken()
-    headers["authorization"] = f"Bearer {new_token}"
-    response = requests.post(targetKeywordSearch, json=payload, headers=headers)
-    return response, new_token
-    
-  if response.status_code != 200:
-    raise RuntimeError(f"API request failed {response.status_code}: {response.text}")
-
-  return response, token
+
+def _page(search, limit, offset):
+  """One page of a search"""
+  return dict(search, Limit=f"{limit}", Offset=f"{offset}")
+
+def _getThroughholeResistorBatch(client, power_id, limit, offset, transform=None):
+  """Internal helper to get a single batch"""
+  return client.keywordSearch(_page(resistorSearch(power_id), limit, offset), transform)
+
+def _parameterTexts(products, parameterId):
+  """ValueText of one parameter for every product, None where it is missing"""
+  return [parameterValue(product, parameterId) for product in products]
 
 def parseResistance(resValue: str) -> float:
-  """Helper for dataframe to sort resistance"""
-  value = str(resValue).strip().lower()
-  match = re.match(r'^(\d+\.?\d*)\s*([kmM]?)ohms?$', value)
-  if not match:
-    return 0.0
-  numStr, unit = match.groups()
-  ohms = float(numStr)
-  if unit == 'k':
-    return ohms * 1000
-  elif unit in ['m', 'M']:
-    return ohms * 1000000
-  return ohms
-
-def extractResistanceForDF(params):
-  try:
-    # Parameter ID 2085 is usually Resistance
-    resText = next((p['ValueText'] for p in params if p['ParameterId'] == 2085), "0 Ohms")
-    return parseResistance(resText)
-  except Exception:
-    return 0.0
+  """Resistance in ohms, 0.0 if the text does not parse"""
+  ohms = parseValue(resValue, "ohm")
+  return 0.0 if math.isnan(ohms) else ohms
+
+def resistanceGroups(products):
+  """
+  Selection groups of resistors: parameter 2085 (Resistance) of the whole
+  page parsed in one batch and snapped to RESISTOR_SERIES
+  """
+  return seriesKeys(parseValues(_parameterTexts(products, 2085), "ohm"), RESISTOR_SERIES).tolist()
 
-def fetch_cheapest_resistors(power_str="0.25W", user_limit=50):
+def _streamCheapest(getBatch, filterValue, groupKeys, user_limit, workers, label, alternates=0, quantity=1):
+  """
+  Yield (group key, product) for the cheapest product of every value group
+  as soon as the group is final. Search results are price-sorted, so most
+  groups are final one page after their cheapest product arrives.
+  Products are projected to ProductRecords while each response is decoded,
+  so neither the selector nor anything downstream holds full product JSON.
+  With `alternates`, that many runners-up per group ride along as the
+  Alternates of the product, ranked like it by the price at `quantity`.
+  """
+  selector = CheapestSelector(groupKeys, sortedByPrice=True, keep=alternates + 1, quantity=quantity)
+  for page in _iterPages(getBatch, filterValue, user_limit, workers, label, ProductRecord.fromProduct):
+    with metrics.stage("select"):
+      ready = selector.addPage(page)
+    yield from ready
+  yield from selector.finish()
+
+def _byKey(stream):
+  return [product for _, product in sorted(stream, key=lambda item: item[0])]
+
+def filterValues(search, parameterId):
+  """
+  (ValueId, ValueName) of every value DigiKey offers for one parameter
+  within a search, read from the FilterOptions of a single-product page
+  """
+  query = _page(search, 1, 0)
+  query.pop("ExcludedContent", None)
+  response = getClient().keywordSearch(query)
+  for parametric in (response.get("FilterOptions") or {}).get("ParametricFilters") or ():
+    if parametric.get("ParameterId") == parameterId:
+      return [(value.get("ValueId"), value.get("ValueName")) for value in parametric.get("FilterValues") or ()]
+  return []
+
+def _restricted(search, parameterId, valueIds):
+  """The search limited to some values of one parameter"""
+  request = search["FilterOptionsRequest"]["ParameterFilterRequest"]
+  filters = list(request["ParameterFilters"]) + [
+    {"ParameterId": parameterId, "FilterValues": [{"Id": f"{valueId}"} for valueId in valueIds]}]
+  return dict(search, FilterOptionsRequest=dict(search["FilterOptionsRequest"],
+                                                ParameterFilterRequest=dict(request, ParameterFilters=filters)))
+
+def valueGroups(search, parameterId, unit, groupSeries, series=None):
+  """
+  Group key -> ValueIds of the values on offer for one parameter of a
+  search, one FilterOptions request. Spellings of one value share a group.
+  `series` keeps only the values of that E-series.
+  """
+  offered = filterValues(search, parameterId)
+  values = parseValues([name for _, name in offered], unit)
+  keys = seriesKeys(values, groupSeries).tolist()
+  wanted = seriesIndex(values, series) != INVALID_KEY if series else [True] * len(keys)
+  groups = {}
+  for (valueId, _), key, keep in zip(offered, keys, wanted):
+    if key != INVALID_KEY and keep:
+      groups.setdefault(key, []).append(valueId)
+  print(f"Planned {len(groups)} queries for {len(offered)} values on offer")
+  return groups
+
+def cheapestOfValue(search, parameterId, key, valueIds, per_value=PLAN_PER_VALUE, alternates=0, quantity=1):
+  """
+  [(key, product)] for the cheapest product of one value group, one
+  price-sorted search of at least `alternates` + 1 products.
+  Empty when none of them has a price.
+  """
+  limit = max(per_value, alternates + 1)
+  page = getClient().keywordSearch(_page(_restricted(search, parameterId, valueIds), limit, 0), ProductRecord.fromProduct)
+  selector = CheapestSelector(lambda products: [key] * len(products), keep=alternates + 1, quantity=quantity)
+  selector.addPage(page)
+  return selector.finish()
+
+def _planCheapest(search, parameterId, unit, groupSeries, series, per_value, workers, alternates=0, quantity=1):
+  """
+  Yield (group key, product) for the cheapest product of every value group
+  without crawling the search: the values on offer come from its
+  FilterOptions, then one price-sorted page of `per_value` products is
+  fetched per group, `workers` at a time.
+  API calls and bytes grow with the number of values, not the catalog.
+  Alternates and prices at `quantity` are ranked among the products
+  fetched per value, at least `alternates` + 1 of them.
+  """
+  client = getClient()
+  groups = valueGroups(search, parameterId, unit, groupSeries, series)
+
+  with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+    futures = [pool.submit(cheapestOfValue, search, parameterId, key, valueIds, per_value, alternates, quantity)
+               for key, valueIds in groups.items()]
+    for future in as_completed(futures):
+      with metrics.stage("fetch wait"):
+        selected = future.result()
+      yield from selected
+
+  if responseCache is not None:
+    print(f"Cache: {responseCache.hits} hits, {responseCache.misses} misses")
+  print(client.scheduler.report())
+
+# Power strings -> Digikey Parameter ID
+# May need to add more mappings here
+POWER_RATINGS = {
+  "0.125W": 10879,
+  "1/8W": 10879,
+  "0.25W": 16543,
+  "1/4W": 16543,
+}
+
+def powerId(power_str):
+  """DigiKey parameter value id of a power rating string"""
+  return POWER_RATINGS.get(power_str, POWER_RATINGS["1/4W"]) # Default to 1/4W if unknown
+
+def stream_cheapest_resistors(power_str="0.25W", user_limit=50, workers=API_WORKERS, alternates=0, quantity=1):
+  """
+  Generator version of fetch_cheapest_resistors: yields (group key, product)
+  while pages are still being fetched, in the order groups become final.
+  """
+  power_id = powerId(power_str)
+  return _streamCheapest(_getThroughholeResistorBatch, power_id, resistanceGroups, user_limit, workers, f"Power ID {power_id}",
+                         alternates, quantity)
+
+def fetch_cheapest_resistors(power_str="0.25W", user_limit=50, workers=API_WORKERS, alternates=0, quantity=1):
   """
   Main public function to get processed resistor list.
   1. Auth
   2. Maps power string to Digikey ID (This map might need expanding)
-  3. Fetches all pages
-  4. Pandas processing to find cheapest
-  """
-  
-  # Map common power strings to Digikey Parameter IDs
-  # May need to add more mappings here
-  power_map = {
-    "0.125W": 10879,
-    "1/8W": 10879,
-    "0.25W": 16543,
-    "1/4W": 16543
-  }
-  
-  power_id = power_map.get(power_str, 16543) # Default to 1/4W if unknown
-  
-  token = getToken()
-  data = []
-  index = 0
-  
-  print(f"Getting batch number 1 for Power ID {power_id}")
-  response, token = _getThroughholeResistorBatch(token, power_id, user_limit, 0)
-  responseData = response.json()
-  data.append(responseData)
-  
-  totalCount = responseData.get("ProductsCount", 0)
-  print(f"Found {totalCount} resistors")
-
-  # Pagination logic
-  if totalCount > user_limit:
-    numOfBatches = math.ceil(totalCount / user_limit)
-    remaining = totalCount - user_limit
-    index = 1
-    while remaining > 0:
-      print(f"Getting batch number {index + 1} of {numOfBatches}")
-      response, token = _getThroughholeResistorBatch(token, power_id, user_limit, (index * user_limit))
-      responseData = response.json()
-      data.append(responseData)
-      index += 1
-      remaining -= user_limit
-
-  # Flatten products
-  all_products = []
-  for batch in data:
-    if "Products" in batch:
-      all_products.extend(batch["Products"])
-
-  if not all_products:
-    return []
-
-  # Pandas Processing
-  df = pd.json_normalize(all_products)
-  df['ResistanceOhms'] = df['Parameters'].apply(extractResistanceForDF)
-  df['ResistanceGroup'] = df['ResistanceOhms'].round(3)
-  
-  # Find cheapest per group
-  cheapest_indices = df.groupby('ResistanceGroup')['UnitPrice'].idxmin()
-  
-  selected_products = [all_products[i] for i in cheapest_indices]
-  return selected_products
-
-def _getThroughholeCapacitorBatch(token, voltage_id, limit, offset):
-  """Internal helper to get a single batch"""
-  
-  payload = {
+  3. Fetches all pages, `workers` at a time
+  4. Keeps the cheapest product per resistance while pages stream in
+  Returns the products ordered by resistance.
+  """
+  return _byKey(stream_cheapest_resistors(power_str, user_limit, workers, alternates, quantity))
+
+def stored_cheapest_resistors(store, power_str="0.25W", user_limit=50, workers=API_WORKERS, max_age=DB_MAX_AGE,
+                              alternates=0, quantity=1):
+  """
+  fetch_cheapest_resistors through a local PartsStore: the search is synced
+  into the store only when it is older than `max_age` seconds, then the
+  cheapest product of the search per value is one indexed query.
+  Returns (group key, product) pairs ordered by resistance.
+  """
+  power_id = powerId(power_str)
+  scope = f"resistor/power={power_id}"
+  if store.isFresh(scope, max_age):
+    print(f"Parts store: {scope} is up to date, no API calls needed")
+  else:
+    store.sync(scope, _iterPages(_getThroughholeResistorBatch, power_id, user_limit, workers, f"Power ID {power_id}"),
+               resistanceGroups)
+  return store.cheapest(scope, alternates + 1, quantity)
+
+def plan_cheapest_resistors(power_str="0.25W", series=None, per_value=PLAN_PER_VALUE, workers=API_WORKERS,
+                            alternates=0, quantity=1):
+  """
+  stream_cheapest_resistors with one small query per resistance on offer,
+  or per resistance of `series` ("E12", ...), instead of a category crawl
+  """
+  return _planCheapest(resistorSearch(powerId(power_str)), 2085, "ohm", RESISTOR_SERIES, series, per_value, workers,
+                       alternates, quantity)
+
+def voltageId(volt_str):
+  """DigiKey filter value of a voltage rating, "6.3v" and "6.3 V" both give "6.3 V" """
+  volts = parseValue(volt_str.replace("v", "V"), "volt")
+  if math.isnan(volts):
+    raise RuntimeError(f"Cannot read the voltage rating {volt_str}")
+  return f"{volts:g} V"
+
+def capacitorSearch(voltage_id):
+  """Keyword search of radial through hole electrolytics of one voltage rating, without Limit and Offset"""
+  return {
     "Keywords": "capacitor",
-    "Limit": f"{limit}",
-    "Offset": f"{offset}",
     "MinimumQuantityAvailable": 1,
     "FilterOptionsRequest": {
       "CategoryFilter": [{"id": "3"}], # capacitor
@@ -173,7 +654,7 @@ def _getThroughholeCapacitorBatch(token, voltage_id, limit, offset):
         "CategoryFilter": {"id": "58"}, # aluminum electrolytic
         "ParameterFilters":[
           {"ParameterId": 3, "FilterValues": [{ "Id": "1900" }]}, # tolerance
-          {"ParameterId": 2079, "FilterValues": [{ "Id": "6.3 V" }]}, # voltage
+          {"ParameterId": 2079, "FilterValues": [{ "Id": voltage_id }]}, # voltage
           {"ParameterId": 52, "FilterValues": [{ "Id": "388275" }]}, # polarization
           {"ParameterId": 69, "FilterValues": [{ "Id": "411897" }]}, # throughhole
           {"ParameterId": 16, "FilterValues": [{ "Id": "392320" }]} # radial can
@@ -184,121 +665,64 @@ def _getThroughholeCapacitorBatch(token, voltage_id, limit, offset):
     "ExcludedContent": ["FilterOptions"],
     "SortOptions": {"Field": "Price","SortOrder": "Ascending"}
   }
-  headers = {
-    "x-digikey-client-id": client_id,
-    "content-type": "application/json",
-    "authorization": f"Bearer {token}"
-  }
 
-  response = requests.post(targetKeywordSearch, json=payload, headers=headers)
+def _getThroughholeCapacitorBatch(client, voltage_id, limit, offset, transform=None):
+  """Internal helper to get a single batch"""
+  return client.keywordSearch(_page(capacitorSearch(voltage_id), limit, offset), transform)
 
-  # Handle token refresh if 401
-  if response.status_code == 401:
-    new_token = getToken()
-    headers["authorization"] = f"Bearer {new_token}"
-    response = requests.post(targetKeywordSearch, json=payload, headers=headers)
-    return response, new_token
-    
-  if response.status_code != 200:
-    raise RuntimeError(f"API request failed {response.status_code}: {response.text}")
+def parseCapacitance(capValue: str) -> float:
+  """Capacitance in farads, 0.0 if the text does not parse"""
+  farads = parseValue(capValue, "farad")
+  return 0.0 if math.isnan(farads) else farads
 
-  return response, token
+def capacitanceGroups(products):
+  """
+  Selection groups of capacitors: parameter 2049 (Capacitance) of the whole
+  page parsed in one batch and snapped to CAPACITOR_SERIES
+  """
+  return seriesKeys(parseValues(_parameterTexts(products, 2049), "farad"), CAPACITOR_SERIES).tolist()
 
-def parseCapacitance(capValue: str) -> float:
-  """Helper for dataframe to sort capacitance"""
-  value = str(capValue).strip().lower()
-  match = re.match(r'^(\d+\.?\d*)\s*([µum]f|mf|f)$', value)
-  if not match:
-    return 0.0
-  numStr, unit = match.groups()
-  capacitance = float(numStr)
-  if unit in ['pf']:
-    return capacitance * 1e-12
-  elif unit in ['nf']:
-    return capacitance * 1e-9
-  elif unit in ['µf', 'uf', 'muf']:      # µF or uF
-    return capacitance * 1e-6         # 1 µF = 10⁻⁶ F
-  elif unit == 'mf':                    # mF
-    return capacitance * 1e-3         # 1 mF = 10⁻³ F
-  elif unit == 'f':                     # F
-    return capacitance                # already in Farads
-  else:
-    return 0.0
+def stream_cheapest_capacitors(volt_str="6.3 V", user_limit=50, workers=API_WORKERS, alternates=0, quantity=1):
+  """
+  Generator version of fetch_cheapest_capacitors: yields (group key, product)
+  while pages are still being fetched, in the order groups become final.
+  """
+  voltage_id = voltageId(volt_str)
+  return _streamCheapest(_getThroughholeCapacitorBatch, voltage_id, capacitanceGroups, user_limit, workers, f"Voltage {voltage_id}",
+                         alternates, quantity)
 
-def extractCapacitanceForDF(params):
-  try:
-    # Parameter ID 2049 is Capacitance
-    capText = next((p['ValueText'] for p in params if p['ParameterID'] == 2049), " 0 F")
-    return parseCapacitance(capText)
-  except Exception:
-    return 0.0
+def plan_cheapest_capacitors(volt_str="6.3 V", series=None, per_value=PLAN_PER_VALUE, workers=API_WORKERS,
+                             alternates=0, quantity=1):
+  """
+  stream_cheapest_capacitors with one small query per capacitance on offer,
+  or per capacitance of `series` ("E6", ...), instead of a category crawl
+  """
+  return _planCheapest(capacitorSearch(voltageId(volt_str)), 2049, "farad", CAPACITOR_SERIES, series, per_value, workers,
+                       alternates, quantity)
 
-def fetch_cheapest_capacitors(volt_str = "6.3 V", user_limit = 50):
+def stored_cheapest_capacitors(store, volt_str="6.3 V", user_limit=50, workers=API_WORKERS, max_age=DB_MAX_AGE,
+                               alternates=0, quantity=1):
+  """
+  fetch_cheapest_capacitors through a local PartsStore, see
+  stored_cheapest_resistors. Returns (group key, product) pairs ordered by
+  capacitance.
+  """
+  voltage_id = voltageId(volt_str)
+  scope = f"capacitor/voltage={voltage_id}"
+  if store.isFresh(scope, max_age):
+    print(f"Parts store: {scope} is up to date, no API calls needed")
+  else:
+    store.sync(scope, _iterPages(_getThroughholeCapacitorBatch, voltage_id, user_limit, workers, f"Voltage {voltage_id}"),
+               capacitanceGroups)
+  return store.cheapest(scope, alternates + 1, quantity)
+
+def fetch_cheapest_capacitors(volt_str = "6.3 V", user_limit = 50, workers=API_WORKERS, alternates=0, quantity=1):
   """
   Main public function to get processed capacitor list.
   1. Auth
   2. Not needed for Capacitors maps power string to Digikey ID (This map might need expanding)
-  3. Fetches all pages
-  4. Pandas processing to find cheapest
-  """
-  
-  token = getToken()
-  data = []
-  index  = 0
-
-  print(f"Getting batchg number 1 for Voltage {volt_str}")
-  response, token = _getThroughholeCapacitorBatch(token, volt_str, user_limit, 0)
-  responseData = response.json()
-  data.append(responseData)
-
-  totalCount = responseData.get("ProductCount", 0)
-  print(f"Found {totalCount} capacitors")
-
- # Pagination logic
-  if totalCount > user_limit:
-    numOfBatches = math.ceil(totalCount / user_limit)
-    remaining = totalCount - user_limit
-    index = 1
-    while remaining > 0:
-      print(f"Getting batch number {index + 1} of {numOfBatches}")
-      response, token = _getThroughholeCapacitorBatch(token, volt_str, user_limit, (index * user_limit))
-      responseData = response.json()
-      data.append(responseData)
-      index += 1
-      remaining -= user_limit
-  # Flatten products
-  all_products = []
-  for batch in data:
-    if "Products" in batch:
-      all_products.extend(batch["Products"])
-
-  if not all_products:
-    return []
-  # Pandas Processing
-  df = pd.json_normalize(all_products)
-  df['CapacitorOhms'] = df['Parameters'].apply(extractCapacitanceForDF)
-  df['CapacitorGroup'] = df['CapacitorOhms'].round(3)
-  
-  # Find cheapest per group
-  cheapest_indices = df.groupby('CapacitorGroup')['UnitPrice'].idxmin()
-  
-  selected_products = [all_products[i] for i in cheapest_indices]
-  return selected_products
-
-
-  
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-  
+  3. Fetches all pages, `workers` at a time
+  4. Keeps the cheapest product per capacitance while pages stream in
+  Returns the products ordered by capacitance.
+  """
+  return _byKey(stream_cheapest_capacitors(volt_str, user_limit, workers, alternates, quantity))
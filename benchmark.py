@@ -0,0 +1,358 @@
+# benchmark.py
+# Offline benchmarks on synthetic DigiKey data, see fixtures.py
+# usage: python benchmark.py select --products 20000
+#        python benchmark.py parse --values 200000
+#        python benchmark.py render --symbols 10000
+#        python benchmark.py generate --products 20000
+#        python benchmark.py records --products 20000
+#        python benchmark.py decode --products 10000
+#        python benchmark.py startup
+#        python benchmark.py e2e --products 1000 10000 100000
+import argparse
+import os
+import re
+import time
+import tracemalloc
+import fixtures
+
+def measure(label, func, *args):
+  """
+  Print the wall time and peak traced memory of func(*args). Time and memory
+  come from separate runs, tracing allocations slows the code down.
+  """
+  start = time.perf_counter()
+  func(*args)
+  elapsed = time.perf_counter() - start
+
+  tracemalloc.start()
+  result = func(*args)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  print(f"{label:<28} {elapsed * 1000:10.1f} ms {peak / 1024**2:10.1f} MiB")
+  return result
+
+def _generateOnly(count):
+  """Cost of producing the fixture pages, included in every selection row"""
+  for _ in fixtures.pages(fixtures.resistorProducts(count), count):
+    pass
+
+def _legacyResistance(resValue):
+  """Per-row resistance parsing as it was before values.py"""
+  value = str(resValue).strip().lower()
+  match = re.match(r'^(\d+\.?\d*)\s*([kmM]?)ohms?$', value)
+  if not match:
+    return 0.0
+  numStr, unit = match.groups()
+  ohms = float(numStr)
+  if unit == 'k':
+    return ohms * 1000
+  elif unit in ['m', 'M']:
+    return ohms * 1000000
+  return ohms
+
+def _legacyExtractResistance(params):
+  try:
+    resText = next((p['ValueText'] for p in params if p['ParameterId'] == 2085), "0 Ohms")
+    return _legacyResistance(resText)
+  except Exception:
+    return 0.0
+
+def _pandasSelect(count):
+  """The selection as it was done before the streaming reducer"""
+  import pandas as pd
+
+  data = list(fixtures.pages(fixtures.resistorProducts(count), count))
+  all_products = []
+  for batch in data:
+    if "Products" in batch:
+      all_products.extend(batch["Products"])
+
+  df = pd.json_normalize(all_products)
+  df['ResistanceOhms'] = df['Parameters'].apply(_legacyExtractResistance)
+  df['ResistanceGroup'] = df['ResistanceOhms'].round(3)
+  cheapest_indices = df.groupby('ResistanceGroup')['UnitPrice'].idxmin()
+  return [all_products[i] for i in cheapest_indices]
+
+def _streamingSelect(count):
+  from api_client import resistanceGroups
+  from selection import CheapestSelector
+
+  selector = CheapestSelector(resistanceGroups)
+  for page in fixtures.pages(fixtures.resistorProducts(count), count):
+    selector.addPage(page)
+  return selector.selected()
+
+def _finalizingSelect(count):
+  from api_client import resistanceGroups
+  from selection import CheapestSelector
+
+  selector = CheapestSelector(resistanceGroups, sortedByPrice=True)
+  selected = []
+  for page in fixtures.pages(fixtures.resistorProducts(count), count):
+    selected.extend(selector.addPage(page))
+  selected.extend(selector.finish())
+  return [product for _, product in sorted(selected, key=lambda item: item[0])]
+
+def benchSelect(args):
+  print(f"Cheapest-per-value selection over {args.products} products")
+  measure("fixture generation only", _generateOnly, args.products)
+  streaming = measure("streaming reducer", _streamingSelect, args.products)
+  finalizing = measure("price-sorted finalization", _finalizingSelect, args.products)
+  print(f"finalized groups identical: {finalizing == streaming}")
+  try:
+    import pandas  # noqa: F401
+  except ImportError:
+    print("pandas is not installed, skipping the json_normalize baseline")
+    return
+  baseline = measure("pd.json_normalize + idxmin", _pandasSelect, args.products)
+  same = [p["ManufacturerProductNumber"] for p in baseline] == [p["ManufacturerProductNumber"] for p in streaming]
+  print(f"{len(streaming)} values selected, identical to baseline: {same}")
+
+def benchParse(args):
+  import random
+  from values import parseValues, seriesKeys
+
+  rng = random.Random(1)
+  texts = [fixtures._resistanceText(rng.choice(fixtures.E24) * 10 ** rng.randint(0, 6)) for _ in range(args.values)]
+  print(f"Parsing and grouping {args.values} resistance strings")
+  legacy = measure("per-row regex + round(3)", lambda: [round(_legacyResistance(t), 3) for t in texts])
+  batched = measure("parseValues + seriesKeys", lambda: seriesKeys(parseValues(texts, "ohm")))
+  print(f"{len(set(legacy))} groups per-row, {len(set(batched.tolist()))} groups batched")
+
+def _symbolData(count):
+  """Symbol template data of `count` parsed synthetic resistors"""
+  from classes import Resistor
+  data = []
+  for product in fixtures.resistorProducts(count):
+    res = Resistor()
+    res.parse(product)
+    data.append(res.symbolData())
+  return data
+
+def benchRender(args):
+  from jinja2 import Environment, FileSystemLoader
+  import utils
+  from classes import Resistor
+
+  data = _symbolData(args.symbols)
+  print(f"Rendering {args.symbols} resistor symbols")
+
+  # As render_template was before: cwd loader, template lookup on every symbol
+  legacy = Environment(loader=FileSystemLoader(utils.PROJECT_ROOT))
+  start = time.perf_counter()
+  before = [legacy.get_template(Resistor.symbolTemplate).render(d) for d in data]
+  elapsed = time.perf_counter() - start
+  print(f"{'get_template per symbol':<28} {elapsed * 1000:10.1f} ms {len(data) / elapsed:10.0f} symbols/s")
+
+  start = time.perf_counter()
+  after = utils.render_templates(Resistor.symbolTemplate, data)
+  elapsed = time.perf_counter() - start
+  print(f"{'render_templates batch':<28} {elapsed * 1000:10.1f} ms {len(data) / elapsed:10.0f} symbols/s")
+  print(f"identical output: {before == after}")
+
+def benchGenerate(args):
+  import tempfile
+  import pipeline
+  from classes import Resistor
+  from footprints import FootprintManager
+  from library import SymbolLibrary
+  from settings import resPreamble
+
+  products = list(fixtures.resistorProducts(args.products))
+  pipeline.PARALLEL_MIN_PRODUCTS = 0
+  print(f"Parsing and rendering {args.products} resistors")
+  outputs = []
+  for jobs in range(1, args.jobs + 1):
+    with tempfile.TemporaryDirectory() as folder:
+      library = SymbolLibrary(os.path.join(folder, "bench.kicad_sym"), resPreamble)
+      footprints = FootprintManager(folder)
+      start = time.perf_counter()
+      pipeline.generate(Resistor, enumerate(products), library, footprints, jobs)
+      elapsed = time.perf_counter() - start
+      outputs.append(library.render())
+    print(f"{f'--jobs {jobs}':<28} {elapsed * 1000:10.1f} ms {len(products) / elapsed:10.0f} products/s")
+  print(f"identical output: {all(output == outputs[0] for output in outputs)}")
+
+def _decodedProducts(count):
+  """Fixture products through a JSON round trip, so they hold their own strings like decoded responses"""
+  import json
+  products = []
+  for page in fixtures.pages(fixtures.resistorProducts(count), count):
+    products.extend(json.loads(json.dumps(page))["Products"])
+  return products
+
+def _retained(build, count):
+  """Bytes still allocated by the result of build(count)"""
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[0]
+  result = build(count)
+  retained = tracemalloc.get_traced_memory()[0] - before
+  tracemalloc.stop()
+  return result, retained
+
+def benchRecords(args):
+  from records import ProductRecord
+
+  print(f"Memory held by {args.products} resistors")
+  products, dictBytes = _retained(_decodedProducts, args.products)
+  records, recordBytes = _retained(lambda count: [ProductRecord.fromProduct(p) for p in _decodedProducts(count)], args.products)
+  print(f"{'decoded product dicts':<28} {dictBytes / 1024**2:10.1f} MiB {dictBytes / args.products:10.0f} bytes/product")
+  print(f"{'ProductRecord':<28} {recordBytes / 1024**2:10.1f} MiB {recordBytes / args.products:10.0f} bytes/product")
+
+  start = time.perf_counter()
+  for product in products:
+    ProductRecord.fromProduct(product)
+  elapsed = time.perf_counter() - start
+  print(f"projection: {elapsed * 1e6 / args.products:.1f} µs/product, {dictBytes / recordBytes:.0f}x smaller")
+
+def _pagePeak(func, raw):
+  """Peak traced memory of decoding one page"""
+  tracemalloc.start()
+  func(raw)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return peak
+
+def benchDecode(args):
+  import json
+  import jsonstream
+  from records import ProductRecord
+  from settings import STREAM_READ_BYTES
+
+  raws = [json.dumps(page).encode("utf-8") for page in fixtures.pages(fixtures.resistorProducts(args.products), args.products)]
+  chunked = lambda raw: (raw[i:i + STREAM_READ_BYTES] for i in range(0, len(raw), STREAM_READ_BYTES))
+  decoders = [("json.loads", json.loads)]
+  if jsonstream.orjson is not None:
+    decoders.append(("orjson.loads", jsonstream.orjson.loads))
+  decoders.append(("json.loads + records", lambda raw: [ProductRecord.fromProduct(p) for p in json.loads(raw)["Products"]]))
+  decoders.append(("loadPage + records", lambda raw: jsonstream.loadPage(raw, ProductRecord.fromProduct)))
+  decoders.append(("incremental + records", lambda raw: jsonstream.decodePage(chunked(raw), ProductRecord.fromProduct)))
+
+  print(f"Decoding {len(raws)} pages of {sum(map(len, raws)) / len(raws) / 1024:.0f} KiB, responses are decoded with {jsonstream.BACKEND}")
+  for label, decode in decoders:
+    start = time.perf_counter()
+    for raw in raws:
+      decode(raw)
+    elapsed = time.perf_counter() - start
+    peak = max(_pagePeak(decode, raw) for raw in raws[:10])
+    print(f"{label:<28} {elapsed * 1000 / len(raws):8.2f} ms/page {peak / 1024:10.0f} KiB peak/page")
+
+# Modules --help and argument errors must not load
+HEAVY_MODULES = ("requests", "numpy", "jinja2", "sqlite3", "pandas")
+
+def benchStartup(args):
+  import subprocess
+  import sys
+
+  here = os.path.dirname(os.path.abspath(__file__))
+  compGen = os.path.join(here, "compGen.py")
+
+  def wall(command):
+    start = time.perf_counter()
+    for _ in range(args.runs):
+      subprocess.run(command, cwd=here, capture_output=True)
+    return (time.perf_counter() - start) / args.runs * 1000
+
+  print(f"Startup, mean of {args.runs} runs")
+  bare = wall([sys.executable, "-c", "pass"])
+  print(f"{'python -c pass':<28} {bare:8.1f} ms")
+  print(f"{'compGen.py --help':<28} {wall([sys.executable, compGen, '--help']):8.1f} ms")
+  print(f"{'compGen.py (argument error)':<28} {wall([sys.executable, compGen]):8.1f} ms")
+
+  # Cumulative import time of compGen, from python -X importtime
+  result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import compGen"], cwd=here, capture_output=True, text=True)
+  rows = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:") and "|" in line]
+  times = {row[2].strip(): int(row[1]) for row in rows if row[1].strip().isdigit()}
+  print(f"{'import compGen':<28} {times.get('compGen', 0) / 1000:8.1f} ms cumulative")
+
+  check = "import sys, compGen; print(' '.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,)
+  loaded = subprocess.run([sys.executable, "-c", check], cwd=here, capture_output=True, text=True).stdout.split()
+  print(f"heavy modules loaded by import compGen: {', '.join(loaded) or 'none'}")
+
+def _percentile(values, fraction):
+  ordered = sorted(values)
+  return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def benchEndToEnd(args):
+  import json
+  import subprocess
+  import sys
+  import tempfile
+  from fake_digikey import FakeDigiKey
+
+  compGen = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compGen.py")
+  print(f"End to end against fake_digikey.py, {args.latency:g} ms latency, {args.rate429:g} 429 rate")
+  print(f"{'run':<24} {'seconds':>8} {'products/s':>11} {'page p50':>9} {'page p95':>9} {'peak MiB':>9} {'requests':>9}")
+  for component in args.component:
+    for count in args.products:
+      fake = FakeDigiKey(products=count, latency=args.latency / 1000, rate429=args.rate429, revokeEvery=args.revokeEvery)
+      env = dict(os.environ, DIGIKEY_API_BASE=fake.start(), DIGIKEY_CLIENT_ID="bench", DIGIKEY_CLIENT_SECRET="bench")
+      with tempfile.TemporaryDirectory() as folder:
+        metricsPath = os.path.join(folder, "metrics.json")
+        command = [sys.executable, compGen, "--component", component, "--noCache", "--footFolder", folder,
+                   "--sym", os.path.join(folder, "bench.kicad_sym"), "--workers", str(args.workers),
+                   "--ratePerMinute", "1000000", "--metrics-json", metricsPath] + (["--plan"] if args.plan else [])
+        start = time.perf_counter()
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        report = json.load(open(metricsPath)) if os.path.exists(metricsPath) else None
+      fake.stop()
+
+      label = f"{component} {count}" + (" plan" if args.plan else "")
+      if result.returncode != 0 or report is None:
+        print(f"{label:<24} failed with exit code {result.returncode}")
+        print("\n".join(result.stdout.splitlines()[-5:] + result.stderr.splitlines()[-5:]))
+        continue
+      pages = [page["seconds"] * 1000 for page in report["pages"]]
+      requests = fake.counts["search"] + fake.counts["token"]
+      print(f"{label:<24} {elapsed:>8.2f} {count / elapsed:>11.0f} {_percentile(pages, 0.5):>7.1f}ms "
+            f"{_percentile(pages, 0.95):>7.1f}ms {(report['peak_rss'] or 0) / 1024**2:>9.1f} {requests:>9}")
+
+def main():
+  cmdArg = argparse.ArgumentParser(description='Offline benchmarks for the generator.')
+  sub = cmdArg.add_subparsers(dest="bench", required=True)
+
+  select = sub.add_parser("select", help="cheapest-per-value selection")
+  select.add_argument("--products", type=int, default=20000)
+  select.set_defaults(func=benchSelect)
+
+  parse = sub.add_parser("parse", help="engineering value parsing and grouping")
+  parse.add_argument("--values", type=int, default=200000)
+  parse.set_defaults(func=benchParse)
+
+  render = sub.add_parser("render", help="symbol template rendering")
+  render.add_argument("--symbols", type=int, default=10000)
+  render.set_defaults(func=benchRender)
+
+  generate = sub.add_parser("generate", help="parse and render stage across worker processes")
+  generate.add_argument("--products", type=int, default=20000)
+  generate.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="compare 1 up to this many processes")
+  generate.set_defaults(func=benchGenerate)
+
+  records = sub.add_parser("records", help="memory of decoded products and ProductRecords")
+  records.add_argument("--products", type=int, default=20000)
+  records.set_defaults(func=benchRecords)
+
+  decode = sub.add_parser("decode", help="JSON decoding of search responses")
+  decode.add_argument("--products", type=int, default=10000)
+  decode.set_defaults(func=benchDecode)
+
+  startup = sub.add_parser("startup", help="compGen start up time and imports")
+  startup.add_argument("--runs", type=int, default=10)
+  startup.set_defaults(func=benchStartup)
+
+  e2e = sub.add_parser("e2e", help="compGen end to end against the local API stand-in")
+  e2e.add_argument("--products", type=int, nargs="+", default=[1000, 10000, 100000])
+  e2e.add_argument("--component", nargs="+", default=["resistor", "capTHRad"], choices=["resistor", "capTHRad"])
+  e2e.add_argument("--workers", type=int, default=8)
+  e2e.add_argument("--latency", type=float, default=20.0, help="milliseconds per API answer")
+  e2e.add_argument("--rate429", type=float, default=0.0, help="fraction of searches answered with 429")
+  e2e.add_argument("--revokeEvery", type=int, default=0, help="revoke the token on every n-th search")
+  e2e.add_argument("--plan", action="store_true", help="run compGen with --plan, one query per value")
+  e2e.set_defaults(func=benchEndToEnd)
+
+  args = cmdArg.parse_args()
+  args.func(args)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,113 @@
+# cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from jsonstream import dumps, loads
+
+class OfflineCacheMiss(RuntimeError):
+  """Raised in offline mode when a request has no cached response"""
+
+class ResponseCache:
+  """
+  On-disk cache of DigiKey responses with a TTL and an LRU size limit,
+  keyed on the request payload within `scope`
+  """
+  def __init__(self, folder, ttl, max_bytes, offline=False, scope=None):
+    self.folder = folder
+    self.scope = scope
+    self.ttl = ttl
+    self.max_bytes = max_bytes
+    self.offline = offline
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    os.makedirs(folder, exist_ok=True)
+    self._bytes = self.evict()
+
+  def key(self, payload):
+    """Stable hash of a request payload within the cache scope"""
+    text = json.dumps([self.scope, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+  def _path(self, payload):
+    return os.path.join(self.folder, self.key(payload) + ".json")
+
+  def get(self, payload):
+    """Cached response for `payload`, or None if missing or expired"""
+    raw = self.getRaw(payload)
+    return None if raw is None else loads(raw)
+
+  def getRaw(self, payload):
+    """Cached response body for `payload` as bytes, or None if missing or expired"""
+    path = self._path(payload)
+    try:
+      age = time.time() - os.path.getmtime(path)
+      if self.offline or age < self.ttl:
+        with open(path, "rb") as file:
+          data = file.read()
+        # Mark as recently used for eviction, keep the age for the TTL
+        os.utime(path, (time.time(), os.path.getmtime(path)))
+        with self._lock:
+          self.hits += 1
+        return data
+    except (OSError, ValueError):
+      pass
+
+    with self._lock:
+      self.misses += 1
+    if self.offline:
+      raise OfflineCacheMiss(f"Offline mode: no cached response for request {self.key(payload)[:12]}")
+    return None
+
+  def put(self, payload, data):
+    """Store a response, decoded or as the raw body bytes, replacing any older copy"""
+    path = self._path(payload)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+      with open(tmp, "wb") as file:
+        file.write(data if isinstance(data, bytes) else dumps(data))
+      size = os.path.getsize(tmp)
+      with self._lock:
+        # Rewriting an entry replaces the older copy, only the difference is added
+        try:
+          size -= os.path.getsize(path)
+        except OSError:
+          pass
+        os.replace(tmp, path)
+        self._bytes += size
+    except OSError as e:
+      print(f"Could not write cache entry {path}. Error: {e}")
+      return
+
+    with self._lock:
+      if self._bytes > self.max_bytes:
+        self._bytes = self.evict()
+
+  def evict(self):
+    """
+    Remove least recently used entries until the cache fits in max_bytes.
+    Returns the size of what is left.
+    """
+    entries = []
+    total = 0
+    with os.scandir(self.folder) as it:
+      for entry in it:
+        if entry.name.endswith(".json"):
+          stat = entry.stat()
+          entries.append((stat.st_atime, stat.st_size, entry.path))
+          total += stat.st_size
+    if total <= self.max_bytes:
+      return total
+
+    entries.sort()
+    for _, size, path in entries:
+      if total <= self.max_bytes:
+        break
+      try:
+        os.remove(path)
+        total -= size
+      except OSError:
+        pass
+    return total
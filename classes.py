@@ -1,40 +1,98 @@
 # classes.py
 import re
-import jmespath
-from pathlib import Path
+from collections import namedtuple
 from settings import om, padSize
-from utils import saveFile, render_template, checkForFootprint, grid_round_up
+from utils import grid_round_up
+from records import digikeyPartNumber, parameterIndex, orderPrice
+from library import ALTERNATE_PREFIX, PRICE_QUANTITY, hiddenProperties
+
+class Field(namedtuple("Field", "attr parameterId value post default")):
+  """
+  One value a component reads from a product.
+  With a parameterId the value comes from that entry of Parameters, `value`
+  naming the key to read (ValueText or ValueId). Without one, `value` is a
+  top-level product key or a function of the product. `post` converts a
+  found value, missing or empty values become `default`.
+  """
+  __slots__ = ()
+
+Field.__new__.__defaults__ = (None, "ValueText", None, "Unknown")
+
+def extraProperties(quantity, alternates):
+  """
+  Symbol properties of the order quantity the prices are at, when it is
+  not 1, and of ranked ((price, product), ...) alternates, numbered from 1
+  """
+  properties = {}
+  if quantity and quantity > 1:
+    properties[PRICE_QUANTITY] = str(quantity)
+  for number, (price, product) in enumerate(alternates, 1):
+    properties[f"{ALTERNATE_PREFIX}{number} Digikey Part#"] = str(digikeyPartNumber(product) or "N/A")
+    properties[f"{ALTERNATE_PREFIX}{number} Manufacture Part#"] = str(product.get("ManufacturerProductNumber") or "Unknown")
+    properties[f"{ALTERNATE_PREFIX}{number} Price"] = str(price)
+  return properties
 
 class Component:
   """Base Component Class"""
+  fields = (
+    Field("mpn", value="ManufacturerProductNumber"),
+    Field("digikeyPN", value=digikeyPartNumber, default="N/A"),
+    Field("datasheet", value="DatasheetUrl", default=""),
+    Field("price", value=orderPrice, default=999.99),
+    Field("quantity", value="OrderQuantity", default=1),
+    Field("dimensions_raw", 46),
+    Field("alternates", value="Alternates", default=()),
+  )
+  _schemas = {}
+
   def __init__(self):
     self.mpn = "Unknown"
     self.digikeyPN = "N/A"
     self.datasheet = ""
     self.price = 0.0
+    self.quantity = 1      # order quantity self.price is at
     self.dimensions_raw = "Unknown"
+    self.alternates = ()   # ((price, product), ...) runners-up of this value
+
+  @classmethod
+  def schema(cls):
+    """
+    Fields of this class and its bases, a subclass field replacing a base
+    field of the same attr. Built once per class.
+    """
+    if cls not in Component._schemas:
+      merged = {}
+      for klass in reversed(cls.__mro__):
+        for field in klass.__dict__.get("fields", ()):
+          merged[field.attr] = field
+      Component._schemas[cls] = tuple(merged.values())
+    return Component._schemas[cls]
 
   def parse(self, product_json):
-    """Base parser using JMESPath for common fields"""
-    _MPN = jmespath.compile("ManufacturerProductNumber")
-    _DKPART = jmespath.compile("""
-        ProductVariations[?PackageType.Id == `2`].DigiKeyProductNumber[0]
-        || ProductVariations[?PackageType.Id == `1`].DigiKeyProductNumber[0]
-        || ProductVariations[0].DigiKeyProductNumber
-        || 'N/A'
-    """)
-    _DATASHEET = jmespath.compile("DatasheetUrl")
-    _PRICE = jmespath.compile("UnitPrice")
-    _SIZE = jmespath.compile("Parameters[?ParameterId == `46`].ValueText | [0]")
-
-    self.mpn = _MPN.search(product_json) or "Unknown"
-    self.digikeyPN = _DKPART.search(product_json) or "N/A"
-    self.datasheet = _DATASHEET.search(product_json) or ""
-    self.price = _PRICE.search(product_json) or 999.99
-    self.dimensions_raw = _SIZE.search(product_json) or "Unknown"
+    """
+    Fill every schema field with one lookup into a per-product parameter
+    index. `product_json` is a decoded product or a ProductRecord.
+    """
+    params = parameterIndex(product_json)
+    for field in self.schema():
+      if field.parameterId is not None:
+        value = params.get(field.parameterId, {}).get(field.value)
+      elif callable(field.value):
+        value = field.value(product_json)
+      else:
+        value = product_json.get(field.value)
+
+      if value:
+        setattr(self, field.attr, field.post(value) if field.post else value)
+      else:
+        setattr(self, field.attr, field.default)
 
 class Resistor(Component):
   """Resistor Component"""
+  # Assumes templates are in templates/symbols/ and templates/footprints/
+  symbolTemplate = 'templates/symbols/ResistorSymbolTemplate.txt'
+  footprintTemplate = 'templates/footprints/TH_ResistorTemplate.kicad_mod'
+
   def __init__(self):
     super().__init__()
     self.resistance = "Unknown"
@@ -46,20 +104,16 @@ class Resistor(Component):
     self.symbol_name = ""
     self.footprint_name = ""
 
+  fields = (
+    Field("resistance", 2085, "ValueId", post=lambda value: value.replace("Ohms", om)),
+    Field("tolerance", 3),
+    Field("power", 2),
+  )
+
   def parse(self, product_json):
     super().parse(product_json)
-    
-    # JMESPath specifically for Resistors
-    _R = jmespath.compile("Parameters[?ParameterId == `2085`].ValueId | [0]")
-    _TOL = jmespath.compile("Parameters[?ParameterId == `3`].ValueText | [0]")
-    _PWR = jmespath.compile("Parameters[?ParameterId == `2`].ValueText | [0]")
-
-    self.resistance = _R.search(product_json) or "Unknown"
-    self.tolerance = _TOL.search(product_json) or "Unknown"
-    self.power = _PWR.search(product_json) or "Unknown"
 
     # Post-Processing
-    self.resistance = self.resistance.replace("Ohms", om)
     self.symbol_name = 'R_' + self.resistance
 
     # Parse Dimensions (Expects: 1.80mm x 3.30mm or similar in raw string)
@@ -68,22 +122,14 @@ class Resistor(Component):
       self.diameter = round(float(match.group(1)), 3)
       self.length = round(float(match.group(2)), 3)
       self.pinPitch = grid_round_up(float(self.length))
+      self.footprint_name = f"R_Axial_L{self.length}mm_D{self.diameter}mm_P{self.pinPitch}mm_Horizontal.kicad_mod"
     else:
       print(f'Dimensions malformed for {self.digikeyPN}: {self.dimensions_raw}')
       self.dimensions_raw = 'FUBAR'
 
-  def makeFootprint(self, output_folder, args):
-    if self.dimensions_raw == 'FUBAR':
-      return
-
-    self.footprint_name = f"R_Axial_L{self.length}mm_D{self.diameter}mm_P{self.pinPitch}mm_Horizontal.kicad_mod"
-    
-    # Check existence
-    if checkForFootprint(self.footprint_name, output_folder):
-      return
-
-    # Prepare Data for Template
-    footprintData = {
+  def footprintData(self):
+    """Template data for this resistor's footprint"""
+    return {
       'padSize': float(padSize),
       'length': float(self.length),
       'diameter': self.diameter,
@@ -93,25 +139,26 @@ class Resistor(Component):
       'refOffsetY': -((float(self.diameter) / 2) + 1.0),
       'valueOffsetX': 0.5,
       'valueOffsetY': (float(self.diameter) / 2) + 0.5
-  }
+    }
 
-    # Render
-    # Assumes template is in templates/footprints/
-    output = render_template('templates/footprints/TH_ResistorTemplate.kicad_mod', footprintData)
-    
-    full_path = Path(output_folder) / self.footprint_name
-    saveFile(output, full_path, 'w')
-    print(f"Created Footprint -> {self.footprint_name}")
+  def makeFootprint(self, footprints):
+    if self.dimensions_raw == 'FUBAR':
+      return
 
-  def makeSymbol(self, library_path):
+    # Rendered and written once per geometry, see FootprintManager
+    footprints.ensure(self.footprint_name, self.footprintTemplate, self.footprintData)
+
+  def symbolData(self):
+    """Template data for this resistor's symbol, None if it cannot have one"""
     if self.resistance == "Unknown":
-      return
+      return None
 
     # Prepare path string for KiCad symbol property
     # Assumes the footprint library nickname is "DigikeyResistors"
     pseudoPathToFootprint = f'DigikeyResistors:{self.footprint_name.replace(".kicad_mod", "")}'
+    extra = extraProperties(self.quantity, self.alternates)
 
-    symbolData = {
+    return {
       'symbol': self.symbol_name,
       'value': self.resistance,
       'tolerance': self.tolerance,
@@ -121,12 +168,10 @@ class Resistor(Component):
       'dkPart': self.digikeyPN,
       'mfrPart': self.mpn,
       'price': self.price,
+      'extra': hiddenProperties(extra),
+      'extraProperties': extra,
     }
 
-    # Assumes template is in templates/symbols/
-    output = render_template('templates/symbols/ResistorSymbolTemplate.txt', symbolData)
-    saveFile(output, library_path, 'a')
-
 class Capacitor(Component):
   """Capacitor Component"""
   def __init__(self):
@@ -142,18 +187,15 @@ class Capacitor(Component):
     self.length = 0.0      # used by axial electrolytics
     self.pin_pitch = 0.0   # lead spacing (radial) or calculated (axial)
   
+  fields = (
+    Field("capacitance", 2049, "ValueId"),
+    Field("tolerance", 3),
+    Field("voltage", 2079),
+  )
+
   def parse(self, product_json):
     super().parse(product_json)
 
-    # JMESPath specifically for capacitors
-    _C = jmespath.compile("Parameters[?ParameterId == `2049`].ValueId | [0]")
-    _TOL = jmespath.compile("Parameters[?ParameterId == `3`].ValueText | [0]")
-    _VOLT = jmespath.compile("Parameters[?ParameterId == `2079`].ValueText | [0]")
-
-    self.capacitance = _C.search(product_json) or "Unknown"
-    self.tolerance = _TOL.search(product_json) or "Unknown"
-    self.voltage = _VOLT.search(product_json) or "Unknown"
-
     # Post-Processing
     self.symbol_name = 'CP_' + self.capacitance
 
@@ -166,23 +208,75 @@ class AluminumElectrolytic(Capacitor):
 
 class Radial(AluminumElectrolytic):
   """Radial Topology Aluminum Electrolytic Capacitor"""
+  # Assumes templates are in templates/symbols/ and templates/footprints/
+  symbolTemplate = 'templates/symbols/CapacitorSymbolTemplate.txt'
+  footprintTemplate = 'templates/footprints/TH_CapacitorRadialTemplate.kicad_mod'
+
   def __init__(self):
     super().__init__()
+    self.dimensions_raw = "Unknown"
+    self.pitch_raw = "Unknown"
+
+  fields = (
+    Field("dimensions_raw", 46),
+    Field("pitch_raw", 508),
+  )
 
   def parse(self, product_json):
-    
     super().parse(product_json)
-    # JMESPath specifically for radial electrolytic capacitors
-    
-    _DIA_RAW = jmespath.compile("Parameters[?ParameterId == `46`].ValueText | [0]")
-    _PIN_PITCH_RAW = jmespath.compile("Parameters[?ParameterId == `508`].ValueText | [0]")
-    
-    self.pin_pitch = _PIN_PITCH_RAW.search(product_json) or "Unknown"
-    self.diameter = _DIA_RAW.search(product_json) or "Unknown"
 
-    # Post-Processing
-    self.pin_pitch = re.search(r'\(.*?\b([\d.]+)\s*mm?\b', self.pin_pitch)
-    self.diameter = re.search(r'\(.*?\b([\d.]+)\s*mm?\b', self.diameter)
+    # Post-Processing (Expects: 0.197" Dia (5.00mm) and 0.079" (2.00mm) or similar)
+    diameter = re.search(r'\(([0-9.]+)\s*mm\)', self.dimensions_raw)
+    pitch = re.search(r'\(([0-9.]+)\s*mm\)', self.pitch_raw)
+    if diameter and pitch:
+      self.diameter = round(float(diameter.group(1)), 3)
+      self.pin_pitch = round(float(pitch.group(1)), 3)
+      self.footprint_name = f"CP_Radial_D{self.diameter:.1f}mm_P{self.pin_pitch:.2f}mm.kicad_mod"
+    else:
+      print(f'Dimensions malformed for {self.digikeyPN}: {self.dimensions_raw} / {self.pitch_raw}')
+      self.dimensions_raw = 'FUBAR'
+
+  def footprintData(self):
+    """Template data for this capacitor's footprint"""
+    # Pads shrink on narrow pitches so they keep a gap of 0.5mm
+    pad = min(float(padSize), round(self.pin_pitch - 0.5, 2))
+    return {
+      'name': self.footprint_name.replace(".kicad_mod", ""),
+      'padSize': pad,
+      'drill': round(pad / 2, 2),
+      'diameter': self.diameter,
+      'pinPitch': self.pin_pitch,
+      'refOffsetY': -(self.diameter / 2 + 1.25),
+      'valueOffsetY': self.diameter / 2 + 1.25,
+      'fabTextSize': min(1.0, round(self.diameter / 5, 2)),
+    }
+
+  def makeFootprint(self, footprints):
+    if self.dimensions_raw == 'FUBAR':
+      return
+
+    # Rendered and written once per (diameter, pitch) geometry, see FootprintManager
+    footprints.ensure(self.footprint_name, self.footprintTemplate, self.footprintData)
 
+  def symbolData(self):
+    """Template data for this capacitor's symbol, None if it cannot have one"""
+    if self.capacitance == "Unknown" or self.dimensions_raw == 'FUBAR':
+      return None
 
+    # Assumes the footprint library nickname is "DigikeyCapacitors"
+    pseudoPathToFootprint = f'DigikeyCapacitors:{self.footprint_name.replace(".kicad_mod", "")}'
+    extra = extraProperties(self.quantity, self.alternates)
 
+    return {
+      'symbol': self.symbol_name,
+      'value': self.capacitance,
+      'tolerance': self.tolerance,
+      'voltage': self.voltage,
+      'footprint': pseudoPathToFootprint,
+      'datasheet': self.datasheet,
+      'dkPart': self.digikeyPN,
+      'mfrPart': self.mpn,
+      'price': self.price,
+      'extra': hiddenProperties(extra),
+      'extraProperties': extra,
+    }
@@ -1,15 +1,38 @@
 # compGen.py
+# Subsystems are imported where they are first used, so --help and argument
+# errors return without loading requests, numpy or jinja2
 import sys
-from classes import Resistor, Radial
-from settings import resPreamble, capTHRadPreamble
-from utils import saveFile, argumentParser
-from api_client import fetch_cheapest_resistors, fetch_cheapest_capacitors
+from components import COMPONENTS
+from utils import argumentParser
+from metrics import metrics
 
 def main():
-  args = argumentParser()
-  
-  # Ensure output directory exists for footprints
+  args = argumentParser(components=HANDLERS)
+
+  # Optional instrumentation, written even when the run fails
+  if args.metricsJson:
+    metrics.enable()
+  profiler = None
+  if args.profile:
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+  try:
+    run(args)
+  finally:
+    if profiler is not None:
+      profiler.disable()
+      profiler.dump_stats(args.profile)
+      print(f"Profile written to {args.profile}, view it with: python -m pstats {args.profile}")
+    if args.metricsJson:
+      print(metrics.summary())
+      metrics.write(args.metricsJson)
+
+def run(args):
   import os
+  from api_client import configureCache, configureClient
+
+  # Ensure output directory exists for footprints
   if not os.path.exists(args.footFolder):
     try:
       os.makedirs(args.footFolder)
@@ -17,70 +40,109 @@ def main():
       print(f"Error creating directory {args.footFolder}: {e}")
       sys.exit(1)
 
-  match args.component:
-    case "resistor":
-      # 1. Fetch Data
-      print(f"Fetching resistors (Power: {args.power})...")
-      selected_products = fetch_cheapest_resistors(power_str=args.power, user_limit=args.limit)
-      
-      if not selected_products:
-        print("No products found.")
-        sys.exit(0)
-
-      print(f"Processing {len(selected_products)} unique resistance values...")
-
-      # 2. Initialize Symbol Library
-      saveFile(resPreamble, args.sym, 'w')
-
-      # 3. Process Each Resistor
-      for product_json in selected_products:
-        res = Resistor()
-        res.parse(product_json)
-        
-        # Create Footprint (.kicad_mod)
-        res.makeFootprint(args.footFolder, args)
-        
-        # Append to Symbol Library (.kicad_sym)
-        res.makeSymbol(args.sym)
-
-      # 4. Finalize Symbol Library
-      saveFile(')', args.sym, 'a')
-      print("Done.")
-
-    case "capTHRad":
-      # 1. Fetch Data
-      print("Fetching capacitor (Voltage: {args.voltage}) ...")
-      selected_products = fetch_cheapest_capacitors(volt_str=args.voltage, user_limits=args.limit)
-
-      if not selected_products:
-        print("No products found,")
-        sys.exit(0)
-
-      print(f"Processing {len(selected_products)} unique capacitance values...")
-
-      # 2. Initialize Symbol Library
-      saveFile(capTHRadPreamble, args.sys, 'w')
-
-      # 3. Process Each Capacitor
-      cap = Radial()
-      cap.parse(product_json)
-
-      # Create Footprint (.kicad_mod)
-      cap.makeFootprint(args.footFolder, args)
-
-      # Append to Symbol Library (.kicad_sym)
-      cap.makeSymbol(args.sys)
-
-      # 4. Finalize Symbol Library
-      saveFile(')', args.sym, 'a')
-      print("Done.")
-
-    case "diode":
-      print('diode - not implemented yet')
+  if args.offline and args.noCache:
+    print("--offline needs the response cache, drop --noCache")
+    sys.exit(1)
+  # Watch mode and --refresh always ask DigiKey, a cached answer would hide the changes they look for
+  if not args.noCache and args.watch is None and not args.refresh:
+    configureCache(args.cacheFolder, args.cacheTTL, args.cacheMaxBytes, offline=args.offline)
+  configureClient(workers=args.workers, token_file=args.tokenFile, per_minute=args.ratePerMinute,
+                  stream_decode=args.streamDecode)
+
+  if args.manifest:
+    from manifest import loadManifest, runManifest
+    try:
+      specs = loadManifest(args.manifest, {"limit": args.limit, "footFolder": args.footFolder, "incremental": args.incremental,
+                                           "alternates": args.alternates, "qty": args.qty})
+      runManifest(specs, workers=args.workers, jobs=args.jobs)
+    except (OSError, ValueError, RuntimeError) as e:
+      print(e)
       sys.exit(1)
-    case _:
-      print("I'm sorry, Dave. I’m afraid I can’t do that.")
+    print("Done.")
+    return
+
+  if args.refresh:
+    from refresh import refreshLibrary
+    print(f"Refreshing prices in {args.sym}...")
+    try:
+      refreshLibrary(args.sym, workers=args.workers)
+    except RuntimeError as e:
+      print(e)
+      sys.exit(1)
+    print("Done.")
+    return
+
+  if args.watch is not None:
+    from watch import watchLibrary
+    try:
+      watchLibrary(args)
+    except RuntimeError as e:
+      print(e)
       sys.exit(1)
+    return
+
+  HANDLERS[args.component](args)
+
+# Component handlers, each importing the subsystems it uses on first call
+
+def generateLibrary(args):
+  """Generate the library of any type in components.COMPONENTS"""
+  from footprints import FootprintManager
+  from library import SymbolLibrary
+  from pipeline import generate
+
+  kind = COMPONENTS[args.component]
+  parts = kind.load()
+  rating = getattr(args, kind.rating)
+
+  # 1. Set up the Symbol Library and footprint folder
+  library = SymbolLibrary(args.sym, parts.preamble, incremental=args.incremental)
+  footprints = FootprintManager(args.footFolder)
+
+  # 2. Fetch, select and process each part as soon as its value is final,
+  #    parsing and rendering across --jobs processes on large runs
+  #    or select from the local parts store, syncing it first if it is stale,
+  #    or with --plan query only the cheapest parts of each value on offer
+  print(f"Fetching {kind.plural} ({kind.rating.capitalize()}: {rating})...")
+  try:
+    if args.db:
+      from partsdb import PartsStore
+      store = PartsStore(args.db)
+      try:
+        selected = parts.stored(store, rating, user_limit=args.limit, workers=args.workers, max_age=args.dbMaxAge,
+                                alternates=args.alternates, quantity=args.qty)
+      finally:
+        store.close()
+    elif args.plan:
+      selected = parts.plan(rating, series=args.series, per_value=args.perValue, workers=args.workers,
+                            alternates=args.alternates, quantity=args.qty)
+    else:
+      selected = parts.stream(rating, user_limit=args.limit, workers=args.workers,
+                              alternates=args.alternates, quantity=args.qty)
+    count = generate(parts.componentClass, selected, library, footprints, args.jobs)
+  except RuntimeError as e:
+    # API failures, an exhausted quota and offline cache misses
+    print(e)
+    sys.exit(1)
+
+  if not count:
+    print("No products found.")
+    sys.exit(0)
+
+  print(f"Processed {count} unique {kind.quantity} values")
+
+  # 3. Write Symbol Library
+  library.write()
+  footprints.save()
+  print("Done.")
+
+def diode(args):
+  print('diode - not implemented yet')
+  sys.exit(1)
+
+# --component -> handler
+HANDLERS = dict.fromkeys(COMPONENTS, generateLibrary)
+HANDLERS["diode"] = diode
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,36 @@
+# components.py
+# The component types libraries are generated for, shared by compGen, manifest.py and watch.py.
+# An entry only holds what differs between types. Its subsystems are imported by load() on
+# first use, so --help and argument errors do not load them
+from collections import namedtuple
+
+# What a component type runs with, see the loaders below:
+# component class, library preamble, the stream/stored/plan fetchers,
+# rating -> keyword search without Limit and Offset, and the series values are grouped on
+Subsystems = namedtuple("Subsystems", "componentClass preamble stream stored plan search groupSeries")
+
+class ComponentType(namedtuple("ComponentType", "rating defaultRating plural quantity valueParameter unit load")):
+  """
+  One component type. `rating` names the command line argument and manifest
+  key of its rating filter, and `load` returns its Subsystems.
+  """
+
+def _resistor():
+  from api_client import plan_cheapest_resistors, powerId, resistorSearch, stored_cheapest_resistors, stream_cheapest_resistors
+  from classes import Resistor
+  from settings import RESISTOR_SERIES, resPreamble
+  return Subsystems(Resistor, resPreamble, stream_cheapest_resistors, stored_cheapest_resistors, plan_cheapest_resistors,
+                    lambda power: resistorSearch(powerId(power)), RESISTOR_SERIES)
+
+def _capacitorRadial():
+  from api_client import capacitorSearch, plan_cheapest_capacitors, stored_cheapest_capacitors, stream_cheapest_capacitors, voltageId
+  from classes import Radial
+  from settings import CAPACITOR_SERIES, capTHRadPreamble
+  return Subsystems(Radial, capTHRadPreamble, stream_cheapest_capacitors, stored_cheapest_capacitors, plan_cheapest_capacitors,
+                    lambda voltage: capacitorSearch(voltageId(voltage)), CAPACITOR_SERIES)
+
+# --component -> component type
+COMPONENTS = {
+  "resistor": ComponentType("power", "0.25W", "resistors", "resistance", 2085, "ohm", _resistor),
+  "capTHRad": ComponentType("voltage", "6.3v", "capacitors", "capacitance", 2049, "farad", _capacitorRadial),
+}
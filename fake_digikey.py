@@ -0,0 +1,246 @@
+# fake_digikey.py
+# Local stand-in for the DigiKey API, serving synthetic fixtures for offline benchmarks
+#   python fake_digikey.py --port 8765 --products 10000 --latency 50
+#   DIGIKEY_API_BASE=http://127.0.0.1:8765 python compGen.py --component resistor ...
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+import fixtures
+
+# Keywords -> product of a catalog by index
+CATALOGS = {
+  "resistor": fixtures.resistorProduct,
+  "capacitor": fixtures.capacitorProduct,
+}
+
+# Keywords -> (ParameterId, ParameterName, value text of a product by index) of the
+# value parameter offered in FilterOptions and filtered on by the query planner
+VALUE_PARAMETERS = {
+  "resistor": (2085, "Resistance", fixtures.resistanceText),
+  "capacitor": (2049, "Capacitance", fixtures.capacitanceText),
+}
+
+# Fixture part numbers: prefix, catalog index, package suffix
+_PART_NUMBER = re.compile(r"^(SYNR|SYNC)(\d{6})")
+_PREFIXES = {"SYNR": fixtures.resistorProduct, "SYNC": fixtures.capacitorProduct}
+
+class _Server(ThreadingHTTPServer):
+  """ThreadingHTTPServer with a listen backlog for bursts from many concurrent workers"""
+  request_queue_size = 128
+  daemon_threads = True
+
+class FakeDigiKey:
+  """
+  Serves the token, keyword search and product details endpoints from
+  synthetic catalogs of `products` products each, generated page by page
+  so any catalog size fits in memory. Faults can be injected:
+    - `latency` seconds (plus up to `jitter`) before every answer
+    - a 429 with Retry-After for a `rate429` fraction of searches
+    - every `revokeEvery`-th search revokes all tokens and answers 401
+  Responses carry X-BurstLimit-* and X-RateLimit-* headers for `burstLimit`
+  calls per minute, without enforcing them.
+  Searches that do not exclude FilterOptions list the values of the
+  VALUE_PARAMETERS parameter, and a filter on that parameter is honoured;
+  other parameter filters are ignored.
+  """
+  def __init__(self, products=10000, latency=0.0, jitter=0.0, rate429=0.0, revokeEvery=0,
+               burstLimit=100000, tokenTTL=600, seed=1, host="127.0.0.1", port=0):
+    self.products = products
+    self.latency = latency
+    self.jitter = jitter
+    self.rate429 = rate429
+    self.revokeEvery = revokeEvery
+    self.burstLimit = burstLimit
+    self.tokenTTL = tokenTTL
+    self.seed = seed
+    self.tokens = set()
+    self.counts = {"token": 0, "search": 0, "details": 0, "401": 0, "429": 0}
+    self._random = random.Random(seed)
+    self._lock = threading.Lock()
+    self._values = {}
+    self.server = _Server((host, port), self._handler())
+    self._thread = None
+
+  @property
+  def url(self):
+    host, port = self.server.server_address[:2]
+    return f"http://{host}:{port}"
+
+  def start(self):
+    """Serve from a background thread, returns the base URL"""
+    self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    self._thread.start()
+    return self.url
+
+  def stop(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+  def _count(self, name):
+    with self._lock:
+      self.counts[name] += 1
+      return self.counts[name]
+
+  def _delay(self):
+    if self.latency or self.jitter:
+      with self._lock:
+        extra = self._random.uniform(0, self.jitter)
+      time.sleep(self.latency + extra)
+
+  def token(self):
+    self._count("token")
+    with self._lock:
+      token = f"fake-{len(self.tokens)}-{self._random.getrandbits(32):08x}"
+      self.tokens.add(token)
+    return 200, {"access_token": token, "expires_in": self.tokenTTL, "token_type": "Bearer"}
+
+  def authorized(self, headers):
+    """None if the request may proceed, else the error response"""
+    token = (headers.get("authorization") or "").removeprefix("Bearer ")
+    with self._lock:
+      known = token in self.tokens
+    if not known:
+      self._count("401")
+      return 401, {"ErrorMessage": "Bearer token not valid"}
+    return None
+
+  def search(self, payload):
+    number = self._count("search")
+    if self.revokeEvery and number % self.revokeEvery == 0:
+      with self._lock:
+        self.tokens.clear()
+    with self._lock:
+      throttled = self._random.random() < self.rate429
+    if throttled:
+      self._count("429")
+      return 429, {"ErrorMessage": "Too many requests"}
+
+    keywords = str(payload.get("Keywords", "")).lower()
+    product = CATALOGS.get(keywords)
+    if product is None:
+      return 200, {"Products": [], "ProductsCount": 0}
+    indices = self._filtered(keywords, payload)
+    offset = int(payload.get("Offset", 0))
+    limit = min(int(payload.get("Limit", 50)), 50)
+    products = [product(index, self.products, self.seed) for index in indices[offset:offset + limit]]
+    response = {"Products": products, "ProductsCount": len(indices)}
+    if "FilterOptions" not in (payload.get("ExcludedContent") or ()):
+      response["FilterOptions"] = self._filterOptions(keywords)
+    return 200, response
+
+  def values(self, keywords):
+    """Value text -> catalog indices in price order, built once per catalog"""
+    with self._lock:
+      if keywords not in self._values:
+        valueText = VALUE_PARAMETERS[keywords][2]
+        index = {}
+        for number in range(self.products):
+          index.setdefault(valueText(number, self.seed), []).append(number)
+        self._values[keywords] = index
+      return self._values[keywords]
+
+  def _filtered(self, keywords, payload):
+    """Catalog indices matching the value filter of a search, all of them without one"""
+    parameterId = VALUE_PARAMETERS[keywords][0]
+    request = (payload.get("FilterOptionsRequest") or {}).get("ParameterFilterRequest") or {}
+    for parametric in request.get("ParameterFilters") or ():
+      if parametric.get("ParameterId") == parameterId:
+        values = self.values(keywords)
+        wanted = {value.get("Id") for value in parametric.get("FilterValues") or ()}
+        return sorted(number for text in wanted for number in values.get(text, ()))
+    return range(self.products)
+
+  def _filterOptions(self, keywords):
+    parameterId, name, _ = VALUE_PARAMETERS[keywords]
+    values = [{"ValueId": text, "ValueName": text, "ProductCount": len(numbers)}
+              for text, numbers in sorted(self.values(keywords).items())]
+    return {"ParametricFilters": [{"ParameterId": parameterId, "ParameterName": name, "FilterValues": values}]}
+
+  def details(self, partNumber):
+    self._count("details")
+    match = _PART_NUMBER.match(partNumber)
+    if not match or int(match.group(2)) >= self.products:
+      return 404, {"ErrorMessage": f"Product {partNumber} not found"}
+    return 200, {"Product": _PREFIXES[match.group(1)](int(match.group(2)), self.products, self.seed)}
+
+  def _handler(self):
+    fake = self
+
+    class Handler(BaseHTTPRequestHandler):
+      protocol_version = "HTTP/1.1"
+
+      def log_message(self, format, *args):
+        pass
+
+      def _answer(self, status, body, extra=None):
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("X-BurstLimit-Limit", str(fake.burstLimit))
+        self.send_header("X-BurstLimit-Remaining", str(fake.burstLimit))
+        for name, value in (extra or {}).items():
+          self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+      def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+      def do_POST(self):
+        body = self._body()
+        fake._delay()
+        if self.path == "/v1/oauth2/token":
+          return self._answer(*fake.token())
+        if self.path == "/products/v4/search/keyword":
+          error = fake.authorized(self.headers)
+          if error:
+            return self._answer(*error)
+          status, response = fake.search(json.loads(body or b"{}"))
+          return self._answer(status, response, {"Retry-After": "1"} if status == 429 else None)
+        self._answer(404, {"ErrorMessage": f"Unknown endpoint {self.path}"})
+
+      def do_GET(self):
+        fake._delay()
+        match = re.fullmatch(r"/products/v4/search/([^/]+)/productdetails", self.path)
+        if not match:
+          return self._answer(404, {"ErrorMessage": f"Unknown endpoint {self.path}"})
+        error = fake.authorized(self.headers)
+        if error:
+          return self._answer(*error)
+        self._answer(*fake.details(unquote(match.group(1))))
+
+    return Handler
+
+def main():
+  cmdArg = argparse.ArgumentParser(description='Local stand-in for the DigiKey API.')
+  cmdArg.add_argument("--host", default="127.0.0.1")
+  cmdArg.add_argument("--port", type=int, default=8765)
+  cmdArg.add_argument("--products", type=int, default=10000, help="Products per catalog")
+  cmdArg.add_argument("--latency", type=float, default=0.0, help="Milliseconds before every answer")
+  cmdArg.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra milliseconds")
+  cmdArg.add_argument("--rate429", type=float, default=0.0, help="Fraction of searches answered with 429")
+  cmdArg.add_argument("--revokeEvery", type=int, default=0, help="Revoke all tokens on every n-th search")
+  cmdArg.add_argument("--seed", type=int, default=1)
+  args = cmdArg.parse_args()
+
+  fake = FakeDigiKey(products=args.products, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                     rate429=args.rate429, revokeEvery=args.revokeEvery, seed=args.seed,
+                     host=args.host, port=args.port)
+  print(f"Serving {args.products} products per catalog on {fake.url}")
+  print(f"Point compGen at it with DIGIKEY_API_BASE={fake.url}")
+  try:
+    fake.server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    print(f"Requests: {fake.counts}")
+    fake.stop()
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,164 @@
+# fixtures.py
+# Synthetic DigiKey search results for benchmarks, shaped like the v4 keyword search response
+import random
+
+E24 = [1.0, 1.1, 1.2, 1.3, 1.5, 1.6, 1.8, 2.0, 2.2, 2.4, 2.7, 3.0,
+       3.3, 3.6, 3.9, 4.3, 4.7, 5.1, 5.6, 6.2, 6.8, 7.5, 8.2, 9.1]
+E6 = [1.0, 1.5, 2.2, 3.3, 4.7, 6.8]
+
+def _formatNumber(value):
+  return f"{value:.2f}".rstrip("0").rstrip(".")
+
+def _resistanceText(ohms):
+  if ohms >= 1e6:
+    return f"{_formatNumber(ohms / 1e6)} MOhms"
+  if ohms >= 1e3:
+    return f"{_formatNumber(ohms / 1e3)} kOhms"
+  return f"{_formatNumber(ohms)} Ohms"
+
+def _capacitanceText(farads):
+  if farads >= 1e-3:
+    return f"{_formatNumber(farads * 1e3)} mF"
+  return f"{_formatNumber(farads * 1e6)} µF"
+
+def _parameter(parameterId, text, value):
+  return {
+    "ParameterId": parameterId,
+    "ParameterText": text,
+    "ParameterType": "String",
+    "ValueId": value,
+    "ValueText": value,
+  }
+
+def _pricing(unitPrice):
+  breaks = [(1, 1.0), (10, 0.7), (100, 0.35), (1000, 0.18), (5000, 0.12)]
+  return [{"BreakQuantity": qty, "UnitPrice": round(unitPrice * factor, 5),
+           "TotalPrice": round(unitPrice * factor * qty, 2)} for qty, factor in breaks]
+
+def _product(rng, index, unitPrice, parameters, prefix, category):
+  mpn = f"{prefix}{index:06d}"
+  variations = []
+  for packageId, packageName, suffix in ((2, "Cut Tape (CT)", "CT-ND"), (1, "Tape & Reel (TR)", "TR-ND"), (6, "Bulk", "-ND")):
+    variations.append({
+      "DigiKeyProductNumber": f"{mpn}{suffix}",
+      "PackageType": {"Id": packageId, "Name": packageName},
+      "StandardPricing": _pricing(unitPrice),
+      "MyPricing": [],
+      "MarketPlace": False,
+      "TariffActive": False,
+      "Supplier": {"Id": 1, "Name": "Synthetic"},
+      "QuantityAvailableforPackageType": rng.randint(0, 100000),
+      "MaxQuantityForDistribution": 0,
+      "MinimumOrderQuantity": 1,
+      "StandardPackage": 5000,
+      "DigiReelFee": 7.0,
+    })
+  return {
+    "Description": {"ProductDescription": f"Synthetic part {mpn}", "DetailedDescription": f"Synthetic part {mpn} for benchmarks"},
+    "Manufacturer": {"Id": 13, "Name": "Synthetic Manufacturing"},
+    "ManufacturerProductNumber": mpn,
+    "UnitPrice": unitPrice,
+    "ProductUrl": f"https://www.digikey.com/en/products/detail/synthetic/{mpn}/{index}",
+    "DatasheetUrl": f"https://example.com/datasheets/{mpn}.pdf",
+    "PhotoUrl": f"https://example.com/photos/{mpn}.jpg",
+    "ProductVariations": variations,
+    "QuantityAvailable": rng.randint(0, 100000),
+    "ProductStatus": {"Id": 0, "Status": "Active"},
+    "BackOrderNotAllowed": False,
+    "NormallyStocking": True,
+    "Discontinued": False,
+    "EndOfLife": False,
+    "Ncnr": False,
+    "PrimaryVideoUrl": None,
+    "Parameters": parameters,
+    "BaseProductNumber": {"Id": index, "Name": prefix},
+    "Category": category,
+    "DateLastBuyChance": None,
+    "ManufacturerLeadWeeks": "12",
+    "ManufacturerPublicQuantity": 0,
+    "Series": {"Id": 1, "Name": "Synthetic"},
+    "ShippingInfo": "",
+    "Classifications": {"ReachStatus": "REACH Unaffected", "RohsStatus": "ROHS3 Compliant",
+                        "MoistureSensitivityLevel": "1  (Unlimited)", "ExportControlClassNumber": "EAR99",
+                        "HtsusCode": "8533.21.0030"},
+    "OtherNames": [f"{mpn}-ALT"],
+  }
+
+def _filler(rng):
+  return [_parameter(pid, "", text) for pid, text in (
+    (5, "Carbon Film"), (69, "Through Hole"), (16, "Axial"), (252, "-55°C ~ 155°C"),
+    (1989, "Flame Proof, Safety"), (17, "±350ppm/°C"), (1500, "2"), (329, "0.094\" (2.40mm)"))]
+
+def _price(index, count, low, high):
+  """Unit prices rise with the index, so products come out price-sorted like the real search"""
+  return round(low + (high - low) * index / max(1, count), 3)
+
+def _rng(seed, index):
+  """Random source of one product, so any product can be generated on its own"""
+  return random.Random(seed * 1000003 + index)
+
+def _ohms(rng):
+  return rng.choice(E24) * 10 ** rng.randint(0, 6)
+
+def _farads(rng):
+  return rng.choice(E6) * 10 ** rng.randint(-7, -3)
+
+def resistanceText(index, seed=1):
+  """Resistance of resistor number `index`, without generating the product"""
+  return _resistanceText(_ohms(_rng(seed, index)))
+
+def capacitanceText(index, seed=1):
+  """Capacitance of capacitor number `index`, without generating the product"""
+  return _capacitanceText(_farads(_rng(seed, index)))
+
+def resistorProduct(index, count, seed=1):
+  """Through hole resistor number `index` of a catalog of `count`"""
+  rng = _rng(seed, index)
+  ohms = _ohms(rng)
+  diameter = rng.choice([1.8, 2.3, 2.4, 2.5, 3.2])
+  length = rng.choice([3.3, 6.3, 6.5, 9.0])
+  parameters = [
+    _parameter(2085, "Resistance", _resistanceText(ohms)),
+    _parameter(3, "Tolerance", "±5%"),
+    _parameter(2, "Power (Watts)", "0.25W, 1/4W"),
+    _parameter(46, "Size / Dimension", f"0.{int(diameter * 39.37):03d}\" Dia x 0.{int(length * 39.37):03d}\" L ({diameter:.2f}mm x {length:.2f}mm)"),
+  ] + _filler(rng)
+  return _product(rng, index, _price(index, count, 0.05, 2.0), parameters, "SYNR",
+                  {"CategoryId": 53, "ParentId": 2, "Name": "Through Hole Resistors"})
+
+def capacitorProduct(index, count, seed=1):
+  """Radial aluminum electrolytic capacitor number `index` of a catalog of `count`"""
+  rng = _rng(seed, index)
+  farads = _farads(rng)
+  diameter = rng.choice([4.0, 5.0, 6.3, 8.0, 10.0, 12.5])
+  pitch = {4.0: 1.5, 5.0: 2.0, 6.3: 2.5, 8.0: 3.5, 10.0: 5.0, 12.5: 5.0}[diameter]
+  parameters = [
+    _parameter(2049, "Capacitance", _capacitanceText(farads)),
+    _parameter(3, "Tolerance", "±20%"),
+    _parameter(2079, "Voltage - Rated", "6.3 V"),
+    _parameter(46, "Size / Dimension", f"0.{int(diameter * 39.37):03d}\" Dia ({diameter:.2f}mm)"),
+    _parameter(508, "Lead Spacing", f"0.{int(pitch * 39.37):03d}\" ({pitch:.2f}mm)"),
+  ] + _filler(rng)
+  return _product(rng, index, _price(index, count, 0.08, 3.0), parameters, "SYNC",
+                  {"CategoryId": 58, "ParentId": 3, "Name": "Aluminum Electrolytic Capacitors"})
+
+def resistorProducts(count, seed=1):
+  """Generate `count` through hole resistors in ascending price order"""
+  for index in range(count):
+    yield resistorProduct(index, count, seed)
+
+def capacitorProducts(count, seed=1):
+  """Generate `count` radial aluminum electrolytic capacitors in ascending price order"""
+  for index in range(count):
+    yield capacitorProduct(index, count, seed)
+
+def pages(products, count, limit=50):
+  """Group generated products into keyword search responses of `limit` products"""
+  page = []
+  for product in products:
+    page.append(product)
+    if len(page) == limit:
+      yield {"Products": page, "ProductsCount": count}
+      page = []
+  if page:
+    yield {"Products": page, "ProductsCount": count}
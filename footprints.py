@@ -0,0 +1,100 @@
+# footprints.py
+import hashlib
+import json
+import os
+from utils import render_template, saveFile, templatePath
+from metrics import metrics
+
+# Manifest of the footprints this tool wrote, kept inside the footprint folder
+MANIFEST_NAME = ".compgen_footprints.json"
+
+def _sha256(content):
+  return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class FootprintManager:
+  """
+  Writes generated footprints into one folder, skipping files that are current
+  and leaving files edited by hand alone.
+  """
+  def __init__(self, folder):
+    self.folder = folder
+    self.manifestPath = os.path.join(folder, MANIFEST_NAME)
+    with os.scandir(folder) as it:
+      self.onDisk = {entry.name for entry in it if entry.is_file()}
+    self.manifest = {}
+    if MANIFEST_NAME in self.onDisk:
+      try:
+        with open(self.manifestPath, "r", encoding="utf-8") as file:
+          self.manifest = json.load(file)
+      except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable footprint manifest {self.manifestPath}. Error: {e}")
+    self.done = set()
+    self.rendered = {}        # fingerprint -> footprint text
+    self.templateHashes = {}  # template path -> hash of its content
+    self.written = 0
+    self.skipped = 0
+    self.changed = False
+
+  def templateHash(self, template):
+    if template not in self.templateHashes:
+      with open(templatePath(template), "r", encoding="utf-8") as file:
+        self.templateHashes[template] = _sha256(file.read())
+    return self.templateHashes[template]
+
+  def fingerprint(self, template, data):
+    key = json.dumps([self.templateHash(template), data], sort_keys=True, default=str)
+    return _sha256(key)
+
+  def render(self, template, data, fingerprint):
+    if fingerprint not in self.rendered:
+      self.rendered[fingerprint] = render_template(template, data)
+    return self.rendered[fingerprint]
+
+  def ensure(self, name, template, makeData):
+    """
+    Make sure footprint `name` exists and is current. `makeData` builds the
+    template data and is only called the first time a name is seen.
+    """
+    if name in self.done:
+      return
+    self.done.add(name)
+
+    data = makeData()
+    fingerprint = self.fingerprint(template, data)
+    entry = self.manifest.get(name)
+    path = os.path.join(self.folder, name)
+
+    if name in self.onDisk:
+      if entry is not None and entry["fingerprint"] == fingerprint:
+        self.skipped += 1
+        return
+      with open(path, "r", encoding="utf-8") as file:
+        current = _sha256(file.read())
+      output = self.render(template, data, fingerprint)
+      if entry is None or entry["sha256"] != current:
+        # Not ours, or edited by hand since we wrote it
+        if current == _sha256(output):
+          self.manifest[name] = {"fingerprint": fingerprint, "sha256": current}
+          self.changed = True
+        self.skipped += 1
+        return
+    else:
+      output = self.render(template, data, fingerprint)
+
+    with metrics.stage("footprint write") as stage:
+      if not output or not saveFile(output, path, 'w'):
+        return
+      stage["bytes"] = len(output)
+    self.onDisk.add(name)
+    self.manifest[name] = {"fingerprint": fingerprint, "sha256": _sha256(output)}
+    self.changed = True
+    self.written += 1
+    print(f"Created Footprint -> {name}")
+
+  def save(self):
+    """Write the manifest if it changed and report what was done"""
+    if self.changed:
+      tmp = self.manifestPath + ".tmp"
+      if saveFile(json.dumps(self.manifest, indent=1, sort_keys=True), tmp, 'w'):
+        os.replace(tmp, self.manifestPath)
+    print(f"Footprints: {self.written} written, {self.skipped} up to date or kept")
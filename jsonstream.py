@@ -0,0 +1,142 @@
+# jsonstream.py
+# JSON decoding for API responses: a fast backend when installed, and incremental decoding of one array
+import codecs
+import json
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+def loads(data):
+  """Decode a whole JSON document from bytes or str"""
+  if orjson is not None:
+    return orjson.loads(data)
+  return json.loads(data)
+
+def dumps(obj):
+  """Encode compact JSON as UTF-8 bytes"""
+  if orjson is not None:
+    return orjson.dumps(obj)
+  return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+class _Reader:
+  """
+  Text read from byte chunks on demand, with the stdlib scanner decoding
+  one value at a time. Consumed text is dropped as decoding goes on, so
+  only the value being decoded and one chunk are held at a time.
+  """
+  def __init__(self, chunks):
+    self.chunks = iter(chunks)
+    self.decoder = codecs.getincrementaldecoder("utf-8")()
+    self.text = ""
+    self.pos = 0
+    self.done = False
+
+  def _more(self):
+    """Read one more chunk, False at the end of the input"""
+    if self.done:
+      return False
+    chunk = next(self.chunks, None)
+    if chunk is None:
+      self.done = True
+      self.text = self.text[self.pos:] + self.decoder.decode(b"", final=True)
+    else:
+      self.text = self.text[self.pos:] + self.decoder.decode(chunk)
+    self.pos = 0
+    return True
+
+  def peek(self):
+    """Next non-whitespace character, "" at the end of the input"""
+    while True:
+      while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+        self.pos += 1
+      if self.pos < len(self.text):
+        return self.text[self.pos]
+      if not self._more():
+        return ""
+
+  def expect(self, char):
+    if self.peek() != char:
+      raise ValueError(f"Expected {char!r} in JSON stream, found {self.peek()!r}")
+    self.pos += 1
+
+  def value(self):
+    """Decode the next value"""
+    self.peek()
+    while True:
+      try:
+        value, end = _decoder.raw_decode(self.text, self.pos)
+        # A number or literal ending with the buffer may continue in the next chunk
+        if end < len(self.text) or self.done:
+          self.pos = end
+          return value
+      except json.JSONDecodeError:
+        if self.done:
+          raise
+      self._more()
+
+def iterObject(chunks, arrayKey="Products"):
+  """
+  Incrementally decode a JSON object from an iterable of byte chunks.
+  Yields (key, value) for every top level member, except that the array
+  under `arrayKey` is yielded one element at a time as (arrayKey, element),
+  so the elements can be consumed without building the whole array.
+  """
+  reader = _Reader(chunks)
+  reader.expect("{")
+  if reader.peek() == "}":
+    return
+  while True:
+    key = reader.value()
+    reader.expect(":")
+    if key == arrayKey and reader.peek() == "[":
+      reader.expect("[")
+      if reader.peek() == "]":
+        reader.pos += 1
+      else:
+        while True:
+          yield key, reader.value()
+          if reader.peek() == ",":
+            reader.pos += 1
+            continue
+          reader.expect("]")
+          break
+    else:
+      yield key, reader.value()
+
+    if reader.peek() == ",":
+      reader.pos += 1
+      continue
+    reader.expect("}")
+    return
+
+def decodePage(chunks, transform=None, arrayKey="Products"):
+  """
+  Decode a search response from byte chunks into a dict, passing each
+  element of `arrayKey` through `transform` as soon as it is decoded.
+  """
+  page = {}
+  items = []
+  for key, value in iterObject(chunks, arrayKey):
+    if key == arrayKey:
+      items.append(transform(value) if transform else value)
+    else:
+      page[key] = value
+  page[arrayKey] = items
+  return page
+
+def loadPage(data, transform=None, arrayKey="Products"):
+  """
+  decodePage for a body that is already in memory: one loads() call, then
+  each element of `arrayKey` goes through `transform`
+  """
+  page = loads(data)
+  items = page.get(arrayKey) or []
+  page[arrayKey] = [transform(item) for item in items] if transform else items
+  return page
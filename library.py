@@ -0,0 +1,186 @@
+# library.py
+import os
+import re
+import stat
+import tempfile
+import time
+from metrics import metrics
+
+# Symbol data keys compared by incremental updates, and the property each one is written to
+TRACKED_PROPERTIES = {
+  "dkPart": "Digikey Part#",
+  "mfrPart": "Manufacture Part#",
+  "price": "Price",
+  "footprint": "Footprint",
+}
+
+# Properties of the alternates of a symbol are named "Alternate 1 Price" and so on.
+# They and the order quantity of the prices are compared as a whole by incremental updates
+ALTERNATE_PREFIX = "Alternate "
+PRICE_QUANTITY = "Price Qty"
+
+# Read once at import, os.umask can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _fileMode(path):
+  """Mode of the file at `path`, or the mode open() would give a new file"""
+  try:
+    return stat.S_IMODE(os.stat(path).st_mode)
+  except OSError:
+    return 0o666 & ~_UMASK
+
+_TOKEN = re.compile(r'\\.|[()"]')
+_SYMBOL_NAME = re.compile(r'\(symbol\s+"((?:[^"\\]|\\.)*)"')
+_PROPERTY = re.compile(r'\(property\s+"((?:[^"\\]|\\.)*)"\s+"((?:[^"\\]|\\.)*)"')
+
+def readLibrary(path):
+  """
+  Split an existing .kicad_sym into its preamble and an index of top level
+  symbols, name -> text. A symbol text runs from the start of its line to
+  the newline after its closing paren, the way the templates render it.
+  """
+  with open(path, "r", encoding="utf-8") as file:
+    text = file.read()
+
+  symbols = {}
+  preambleEnd = None
+  previousEnd = 0
+  symbol = None
+  depth = 0
+  inString = False
+  for token in _TOKEN.finditer(text):
+    char = token.group()
+    if char == '"':
+      inString = not inString
+    elif inString or len(char) > 1:
+      continue
+    elif char == "(":
+      depth += 1
+      if depth == 2:
+        symbol = _SYMBOL_NAME.match(text, token.start())
+        if symbol:
+          start = max(previousEnd, text.rfind("\n", 0, token.start()) + 1)
+          if preambleEnd is None:
+            preambleEnd = start
+    elif char == ")":
+      depth -= 1
+      if depth == 1 and symbol:
+        end = token.end() + 1 if text.startswith("\n", token.end()) else token.end()
+        symbols[symbol.group(1)] = text[start:end]
+        previousEnd = end
+        symbol = None
+
+  if preambleEnd is None:
+    preambleEnd = text.rfind(")")
+  return text[:preambleEnd], symbols
+
+def symbolProperties(symbolText):
+  """Property name -> value of a symbol, sub-symbols included"""
+  return {name: value for name, value in _PROPERTY.findall(symbolText)}
+
+def hiddenProperties(properties):
+  """
+  Hidden symbol properties for name -> value, each on its own lines after
+  a newline, in the layout of the symbol templates
+  """
+  return "".join(f'\n\t\t(property "{name}" "{value}"\n\t\t\t(at 0 0 0)\n\t\t\t(effects\n\t\t\t\t(font\n'
+                 f'\t\t\t\t\t(size 1.27 1.27)\n\t\t\t\t)\n\t\t\t\t(hide yes)\n\t\t\t)\n\t\t)'
+                 for name, value in properties.items())
+
+class SymbolLibrary:
+  """
+  Builds a .kicad_sym symbol library and writes it atomically, in incremental
+  mode keeping the text of existing symbols whose tracked properties are unchanged.
+  """
+  def __init__(self, path, preamble, incremental=False):
+    self.path = path
+    self.preamble = preamble
+    self.symbols = {}   # symbol name -> rendered symbol text
+    self.existing = {}
+    self.added = []
+    self.updated = []
+    self.unchanged = 0
+    if incremental and os.path.exists(path):
+      self.preamble, self.existing = readLibrary(path)
+
+  def keep(self, name, symbolData):
+    """
+    Carry over the existing symbol `name` if its tracked properties match
+    `symbolData`. Returns False when the symbol has to be rendered.
+    """
+    old = self.existing.get(name)
+    if old is None:
+      return False
+    properties = symbolProperties(old)
+    for key, propertyName in TRACKED_PROPERTIES.items():
+      if properties.get(propertyName) != str(symbolData.get(key)):
+        return False
+    extra = {key: value for key, value in properties.items() if key.startswith(ALTERNATE_PREFIX) or key == PRICE_QUANTITY}
+    if extra != symbolData.get("extraProperties", {}):
+      return False
+    self.symbols[name] = old
+    self.unchanged += 1
+    return True
+
+  def keepExisting(self):
+    """Carry over every existing symbol as it is"""
+    for name, text in self.existing.items():
+      self.symbols.setdefault(name, text)
+    self.unchanged = len(self.symbols)
+
+  def add(self, name, text):
+    """Add or replace one rendered symbol"""
+    if text:
+      if name in self.existing:
+        self.updated.append(name)
+      else:
+        self.added.append(name)
+      self.symbols[name] = text
+
+  def orderBy(self, sortKeys):
+    """Order symbols by sortKeys[name], symbols without a key keep their order at the end"""
+    self.symbols = dict(sorted(self.symbols.items(),
+                               key=lambda item: (item[0] not in sortKeys, sortKeys.get(item[0], 0))))
+
+  def removed(self):
+    """Existing symbols that were neither kept nor added again"""
+    return [name for name in self.existing if name not in self.symbols]
+
+  def summary(self):
+    return (f"{len(self.added)} added, {len(self.updated)} updated, "
+            f"{len(self.removed())} removed, {self.unchanged} unchanged")
+
+  def render(self):
+    """Complete library text"""
+    return self.preamble + "".join(self.symbols.values()) + ")"
+
+  def write(self):
+    """Atomically replace the library file. Returns the number of bytes written."""
+    if self.existing:
+      print(f"Library update: {self.summary()}")
+      if not (self.added or self.updated or self.removed()):
+        return 0
+
+    start = time.perf_counter()
+    content = self.render().encode("utf-8")
+    folder = os.path.dirname(os.path.abspath(self.path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(self.path)}.", suffix=".tmp")
+    try:
+      with os.fdopen(fd, "wb") as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+      # mkstemp creates the file 0600, keep the mode a plain open() would give
+      os.chmod(tmp, _fileMode(self.path))
+      os.replace(tmp, self.path)
+    except OSError as e:
+      print(f"Could not write library {self.path}. Error: {e}")
+      if os.path.exists(tmp):
+        os.remove(tmp)
+      return 0
+
+    elapsed = time.perf_counter() - start
+    metrics.add("library write", elapsed, len(content))
+    print(f"Wrote {len(self.symbols)} symbols ({len(content)} bytes) to {self.path} in {elapsed * 1000:.1f} ms")
+    return len(content)
@@ -0,0 +1,129 @@
+# manifest.py
+# Many component libraries from one run, described by a JSON, TOML or YAML manifest
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from components import COMPONENTS
+from footprints import FootprintManager
+from library import SymbolLibrary
+from pipeline import generate
+from settings import API_LIMIT, JOBS, MANIFEST_CONCURRENCY, ALTERNATES, ORDER_QUANTITY
+
+# Keys a spec may set, directly or through "defaults", the rating of each component type included
+SPEC_KEYS = ("component", "limit", "sym", "footFolder", "incremental", "alternates", "qty") + \
+  tuple(dict.fromkeys(kind.rating for kind in COMPONENTS.values()))
+
+def _rating(spec):
+  kind = COMPONENTS[spec["component"]]
+  return spec.get(kind.rating, kind.defaultRating)
+
+def _query(spec):
+  """The search a spec needs, equal for specs that share one crawl"""
+  search = COMPONENTS[spec["component"]].load().search(_rating(spec))
+  return (json.dumps(search, sort_keys=True), spec["limit"], spec["alternates"], spec["qty"])
+
+def _fetch(spec, workers):
+  parts = COMPONENTS[spec["component"]].load()
+  return list(parts.stream(_rating(spec), spec["limit"], workers, spec["alternates"], spec["qty"]))
+
+def loadManifest(path, defaults=None):
+  """
+  Read the specs of a manifest. The file holds a "jobs" list of specs and
+  optional "defaults" every spec starts from, for example in TOML:
+
+    [defaults]
+    footFolder = "footprints"
+
+    [[jobs]]
+    component = "resistor"
+    power = "1/4W"
+    sym = "R_quarter_watt.kicad_sym"
+
+  `defaults` are the command line values used where neither sets a key.
+  """
+  extension = os.path.splitext(path)[1].lower()
+  with open(path, "rb") as file:
+    if extension == ".json":
+      data = json.load(file)
+    elif extension == ".toml":
+      try:
+        import tomllib
+      except ImportError:   # Python < 3.11
+        raise RuntimeError("Reading a TOML manifest needs Python 3.11 or newer")
+      data = tomllib.load(file)
+    elif extension in (".yaml", ".yml"):
+      try:
+        import yaml
+      except ImportError:
+        raise RuntimeError("Reading a YAML manifest needs PyYAML: pip install pyyaml")
+      data = yaml.safe_load(file)
+    else:
+      raise RuntimeError(f"Unknown manifest format {extension}, use .json, .toml or .yaml")
+
+  if not isinstance(data, dict):
+    raise ValueError(f"{path}: a manifest must be a mapping with a \"jobs\" list, not {type(data).__name__}")
+
+  specs = []
+  for index, job in enumerate(data.get("jobs") or []):
+    spec = {"limit": API_LIMIT, "footFolder": ".", "incremental": False, "alternates": ALTERNATES, "qty": ORDER_QUANTITY}
+    spec.update(defaults or {})
+    spec.update(data.get("defaults") or {})
+    spec.update(job)
+    unknown = set(spec) - set(SPEC_KEYS)
+    if unknown:
+      raise RuntimeError(f"Job {index + 1} of {path}: unknown keys {', '.join(sorted(unknown))}")
+    if spec.get("component") not in COMPONENTS:
+      raise RuntimeError(f"Job {index + 1} of {path}: component must be one of {', '.join(COMPONENTS)}")
+    if not spec.get("sym"):
+      raise RuntimeError(f"Job {index + 1} of {path}: no sym library given")
+    specs.append(spec)
+  return specs
+
+def planManifest(specs):
+  """
+  Group specs by the search they need, so specs that differ only in their
+  output, or in spellings like 0.25W and 1/4W, share one crawl.
+  Returns query -> [spec].
+  """
+  plan = {}
+  targets = set()
+  for spec in specs:
+    target = os.path.abspath(spec["sym"])
+    if target in targets:
+      raise RuntimeError(f"More than one job writes {spec['sym']}")
+    targets.add(target)
+    plan.setdefault(_query(spec), []).append(spec)
+  return plan
+
+def runManifest(specs, workers, jobs=JOBS):
+  """
+  Run every spec of a manifest with the shared client. Up to
+  MANIFEST_CONCURRENCY searches are crawled at the same time, all paced by
+  the one request scheduler, and the libraries of a search are generated
+  as soon as it completes. Footprint folders are shared between specs.
+  """
+  plan = planManifest(specs)
+  print(f"{len(specs)} jobs need {len(plan)} searches")
+  footprints = {}
+
+  with ThreadPoolExecutor(max_workers=max(1, min(len(plan), MANIFEST_CONCURRENCY))) as pool:
+    futures = {}
+    for query, querySpecs in plan.items():
+      futures[pool.submit(_fetch, querySpecs[0], workers)] = query
+
+    for future in as_completed(futures):
+      selected = future.result()
+      for spec in plan[futures[future]]:
+        parts = COMPONENTS[spec["component"]].load()
+        folder = spec["footFolder"]
+        if folder not in footprints:
+          os.makedirs(folder, exist_ok=True)
+          footprints[folder] = FootprintManager(folder)
+
+        print(f"Generating {spec['sym']} from {len(selected)} values")
+        library = SymbolLibrary(spec["sym"], parts.preamble, incremental=spec["incremental"])
+        generate(parts.componentClass, selected, library, footprints[folder], jobs)
+        library.write()
+
+  for manager in footprints.values():
+    manager.save()
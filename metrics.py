@@ -0,0 +1,102 @@
+# metrics.py
+# Per-stage run metrics: wall time, calls, bytes and peak memory
+import json
+import platform
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+  import resource
+except ImportError:   # Windows
+  resource = None
+
+def _peakRss():
+  """Peak resident memory of this process in bytes, None where it is not available"""
+  if resource is None:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return peak if platform.system() == "Darwin" else peak * 1024
+
+class Metrics:
+  """Calls, seconds, bytes and peak memory per stage of a run, and one record per fetched page"""
+  def __init__(self):
+    self.enabled = False
+    self.started = time.perf_counter()
+    self.stages = {}
+    self.pages = []
+    self._lock = threading.Lock()
+
+  def enable(self):
+    self.enabled = True
+    self.started = time.perf_counter()
+
+  def add(self, name, seconds=0.0, bytes=0, calls=1):
+    """Record `calls` calls of stage `name` that took `seconds` and moved `bytes`"""
+    if not self.enabled:
+      return
+    peak = _peakRss()
+    with self._lock:
+      stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0, "peak_rss": None})
+      stage["calls"] += calls
+      stage["seconds"] += seconds
+      stage["bytes"] += bytes
+      if peak is not None:
+        stage["peak_rss"] = max(stage["peak_rss"] or 0, peak)
+
+  @contextmanager
+  def _timed(self, name):
+    start = time.perf_counter()
+    counter = {"bytes": 0}
+    try:
+      yield counter
+    finally:
+      self.add(name, time.perf_counter() - start, counter["bytes"])
+
+  def stage(self, name):
+    """
+    Context manager timing one call of stage `name`. Set bytes on the
+    value it yields to record bytes:
+      with metrics.stage("http") as stage:
+        stage["bytes"] = len(response.content)
+    """
+    if not self.enabled:
+      return nullcontext({"bytes": 0})
+    return self._timed(name)
+
+  def page(self, **fields):
+    """Record one fetched page, e.g. its offset, seconds, bytes and whether it was cached, with the peak memory after it"""
+    if self.enabled:
+      fields["peak_rss"] = _peakRss()
+      with self._lock:
+        self.pages.append(fields)
+
+  def clearPages(self):
+    """Drop the page records, so a long running process does not collect them forever"""
+    with self._lock:
+      self.pages.clear()
+
+  def report(self):
+    return {
+      "seconds": time.perf_counter() - self.started,
+      "peak_rss": _peakRss(),
+      "stages": self.stages,
+      "pages": self.pages,
+    }
+
+  def summary(self):
+    """One line per stage, slowest first"""
+    lines = [f"{'stage':<18} {'calls':>8} {'seconds':>10} {'MiB':>10}"]
+    for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"]):
+      lines.append(f"{name:<18} {stage['calls']:>8} {stage['seconds']:>10.3f} {stage['bytes'] / 1024**2:>10.2f}")
+    lines.append(f"total {time.perf_counter() - self.started:.3f} s, peak memory {(_peakRss() or 0) / 1024**2:.1f} MiB")
+    return "\n".join(lines)
+
+  def write(self, path):
+    """Write the metrics as JSON"""
+    with open(path, "w", encoding="utf-8") as file:
+      json.dump(self.report(), file, indent=1)
+    print(f"Metrics written to {path}")
+
+# Metrics of this run, see compGen --metrics-json
+metrics = Metrics()
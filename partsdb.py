@@ -0,0 +1,127 @@
+# partsdb.py
+import hashlib
+import json
+import math
+import sqlite3
+import time
+from records import ProductRecord, digikeyPartNumber
+from selection import CheapestSelector
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+  dk_part TEXT PRIMARY KEY,
+  scope TEXT NOT NULL,
+  position INTEGER NOT NULL,
+  value_key INTEGER,
+  unit_price REAL,
+  hash TEXT NOT NULL,
+  synced_at REAL NOT NULL,
+  product TEXT NOT NULL
+);
+DROP INDEX IF EXISTS products_power;
+DROP INDEX IF EXISTS products_voltage;
+CREATE INDEX IF NOT EXISTS products_value ON products (scope, value_key, unit_price, position);
+CREATE INDEX IF NOT EXISTS products_scope ON products (scope, synced_at);
+CREATE TABLE IF NOT EXISTS syncs (
+  scope TEXT PRIMARY KEY,
+  synced_at REAL NOT NULL,
+  products INTEGER NOT NULL
+);
+"""
+
+class PartsStore:
+  """
+  Local SQLite store of the products of synced searches, each search a scope,
+  with the cheapest product per value of a scope one indexed query.
+  """
+  def __init__(self, path):
+    self.path = path
+    self.db = sqlite3.connect(path)
+    self.db.executescript(SCHEMA)
+
+  def close(self):
+    self.db.close()
+
+  def syncedAt(self, scope):
+    """Time of the last complete sync of `scope`, None if it was never synced"""
+    row = self.db.execute("SELECT synced_at FROM syncs WHERE scope = ?", (scope,)).fetchone()
+    return row[0] if row else None
+
+  def isFresh(self, scope, max_age):
+    synced = self.syncedAt(scope)
+    return synced is not None and time.time() - synced < max_age
+
+  def _rows(self, scope, products, groupKeys, position, now):
+    for offset, (product, key) in enumerate(zip(products, groupKeys(products))):
+      text = json.dumps(product, sort_keys=True, separators=(",", ":"))
+      price = product.get("UnitPrice")
+      yield {
+        "dk_part": digikeyPartNumber(product) or product.get("ManufacturerProductNumber"),
+        "scope": scope,
+        "position": position + offset,
+        "value_key": key,
+        "unit_price": None if price is None or (isinstance(price, float) and math.isnan(price)) else price,
+        "hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "synced_at": now,
+        "product": text,
+      }
+
+  def sync(self, scope, pages, groupKeys):
+    """
+    Store every product of `pages`, search results of `scope`, in one
+    transaction. `groupKeys` maps a list of products to their value keys.
+    Returns (added, updated, unchanged, removed).
+    """
+    now = time.time()
+    added = updated = unchanged = position = 0
+    with self.db:
+      for page in pages:
+        products = page.get("Products") or []
+        if not products:
+          continue
+        rows = list(self._rows(scope, products, groupKeys, position, now))
+        position += len(products)
+        parts = [row["dk_part"] for row in rows]
+        known = dict(self.db.execute(
+          f"SELECT dk_part, hash FROM products WHERE dk_part IN ({','.join('?' * len(parts))})", parts))
+
+        same = [row for row in rows if known.get(row["dk_part"]) == row["hash"]]
+        changed = [row for row in rows if known.get(row["dk_part"]) != row["hash"]]
+        self.db.executemany(
+          "UPDATE products SET scope = :scope, position = :position, synced_at = :synced_at WHERE dk_part = :dk_part", same)
+        self.db.executemany(
+          f"INSERT OR REPLACE INTO products ({', '.join(rows[0])}) VALUES ({', '.join(':' + name for name in rows[0])})", changed)
+        unchanged += len(same)
+        updated += sum(1 for row in changed if row["dk_part"] in known)
+        added += sum(1 for row in changed if row["dk_part"] not in known)
+
+      removed = self.db.execute("DELETE FROM products WHERE scope = ? AND synced_at < ?", (scope, now)).rowcount
+      self.db.execute("INSERT OR REPLACE INTO syncs (scope, synced_at, products) VALUES (?, ?, ?)", (scope, now, position))
+
+    print(f"Parts store: {added} added, {updated} updated, {unchanged} unchanged, {removed} removed")
+    return added, updated, unchanged, removed
+
+  def cheapest(self, scope, keep=1, quantity=1):
+    """
+    Cheapest product per value group of `scope`, as (group key, product)
+    ordered by key. Products without a price never win and ties go to the
+    product listed first by the search, the same choice CheapestSelector
+    makes. With `keep` > 1 or an order `quantity`, the rows are ranked by a
+    CheapestSelector instead, so alternates and price breaks come out the
+    same as from a crawl.
+    """
+    if keep > 1 or quantity > 1:
+      selector = CheapestSelector(None, keep=keep, quantity=quantity)
+      rows = self.db.execute("SELECT value_key, product FROM products WHERE scope = ? AND unit_price IS NOT NULL "
+                             "ORDER BY position", (scope,))
+      for key, product in rows:
+        selector.add(ProductRecord.fromProduct(json.loads(product)), key)
+      return selector.finish()
+
+    query = """
+      SELECT value_key, product FROM (
+        SELECT value_key, product,
+               ROW_NUMBER() OVER (PARTITION BY value_key ORDER BY unit_price, position) AS rank
+        FROM products WHERE scope = ? AND unit_price IS NOT NULL)
+      WHERE rank = 1 ORDER BY value_key"""
+    return [(key, json.loads(product)) for key, product in self.db.execute(query, (scope,))]
@@ -0,0 +1,90 @@
+# pipeline.py
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from settings import JOBS, PARALLEL_MIN_PRODUCTS, STREAM_CHUNK
+from utils import render_templates
+from metrics import metrics
+
+def _parseAndRender(componentClass, products):
+  """
+  Worker stage: parse a chunk of products and render their symbols.
+  Returns (component, symbol data, symbol text) per product, in order.
+  """
+  parts = []
+  with metrics.stage("parse"):
+    for product_json in products:
+      part = componentClass()
+      part.parse(product_json)
+      parts.append(part)
+
+  symbolData = [part.symbolData() for part in parts]
+  texts = iter(render_templates(componentClass.symbolTemplate, [data for data in symbolData if data is not None]))
+  return [(part, data, next(texts) if data is not None else "") for part, data in zip(parts, symbolData)]
+
+def generate(componentClass, stream, library, footprints, jobs=JOBS):
+  """
+  Parse, render and write components while (group key, product) pairs
+  stream in from the selector. Each footprint is written as soon as its
+  product arrives, and symbols are collected in the library, which is
+  ordered by group key at the end.
+  Products are parsed and rendered in chunks of STREAM_CHUNK. The chunks of
+  the first PARALLEL_MIN_PRODUCTS products are processed in this process,
+  past that, with jobs > 1, they go to `jobs` worker processes and their
+  results are merged back in stream order.
+  Returns the number of products processed.
+  """
+  order = {}
+  count = 0
+  pool = None
+  pending = deque()     # (keys, future) in submission order
+  keys, products = [], []
+
+  def merge(chunkKeys, results):
+    for key, (part, symbolData, text) in zip(chunkKeys, results):
+      # Create Footprint (.kicad_mod)
+      part.makeFootprint(footprints)
+
+      # Add to Symbol Library (.kicad_sym)
+      if symbolData is None:
+        continue
+      order[part.symbol_name] = key
+      if not library.keep(part.symbol_name, symbolData):
+        library.add(part.symbol_name, text)
+
+  try:
+    for key, product_json in stream:
+      count += 1
+      keys.append(key)
+      products.append(product_json)
+      if pool is None and jobs > 1 and count > PARALLEL_MIN_PRODUCTS:
+        # Fetch threads are running by now, a forked worker could inherit a lock one of them holds
+        pool = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"))
+
+      if len(products) < STREAM_CHUNK:
+        continue
+      if pool is None:
+        merge(keys, _parseAndRender(componentClass, products))
+      else:
+        pending.append((keys, pool.submit(_parseAndRender, componentClass, products)))
+      keys, products = [], []
+
+      while pending and pending[0][1].done():
+        chunkKeys, future = pending.popleft()
+        merge(chunkKeys, future.result())
+        metrics.add("worker chunks", calls=1)
+
+    while pending:
+      chunkKeys, future = pending.popleft()
+      with metrics.stage("worker wait"):
+        results = future.result()
+      merge(chunkKeys, results)
+      metrics.add("worker chunks", calls=1)
+    if products:
+      merge(keys, _parseAndRender(componentClass, products))
+  finally:
+    if pool is not None:
+      pool.shutdown(cancel_futures=True)
+
+  library.orderBy(order)
+  return count
@@ -0,0 +1,136 @@
+# records.py
+# Compact projections of DigiKey products, and reads that work on both forms
+import sys
+
+# Parameters read by the component classes, value grouping and the parts store.
+# A parameter missing here reads as absent from a record.
+RECORD_PARAMETERS = frozenset((
+  2,      # Power (Watts)
+  3,      # Tolerance
+  46,     # Size / Dimension
+  508,    # Lead Spacing
+  2049,   # Capacitance
+  2079,   # Voltage - Rated
+  2085,   # Resistance
+))
+
+def _intern(value):
+  return sys.intern(value) if type(value) is str else value
+
+class ProductRecord:
+  """
+  The fields of a DigiKey product this tool reads, answering get() like a product dict
+  """
+  __slots__ = ("ManufacturerProductNumber", "DigiKeyProductNumber", "DatasheetUrl", "UnitPrice",
+               "StandardPricing", "OrderQuantity", "OrderPrice", "Alternates", "parameters")
+
+  def __init__(self, mpn, digikeyPN, datasheet, unitPrice, parameters=(), pricing=()):
+    self.ManufacturerProductNumber = mpn
+    self.DigiKeyProductNumber = digikeyPN
+    self.DatasheetUrl = datasheet
+    self.UnitPrice = unitPrice
+    self.StandardPricing = pricing  # ((BreakQuantity, UnitPrice), ...) ascending
+    self.OrderQuantity = None       # quantity the product was ranked at
+    self.OrderPrice = None          # unit price at OrderQuantity
+    self.Alternates = ()            # ((price, record), ...) cheapest first
+    self.parameters = parameters    # ((ParameterId, ValueText, ValueId), ...)
+
+  @classmethod
+  def fromProduct(cls, product_json, parameterIds=RECORD_PARAMETERS):
+    """Project one decoded product, a record is returned as it is"""
+    if isinstance(product_json, ProductRecord):
+      return product_json
+    parameters = []
+    seen = set()
+    for parameter in product_json.get("Parameters") or ():
+      parameterId = parameter.get("ParameterId")
+      if parameterId in parameterIds and parameterId not in seen:
+        seen.add(parameterId)
+        parameters.append((parameterId, _intern(parameter.get("ValueText")), _intern(parameter.get("ValueId"))))
+    return cls(product_json.get("ManufacturerProductNumber"), digikeyPartNumber(product_json),
+               product_json.get("DatasheetUrl"), product_json.get("UnitPrice"), tuple(parameters),
+               standardPricing(product_json))
+
+  def get(self, key, default=None):
+    return getattr(self, key, default)
+
+  def parameter(self, parameterId, key="ValueText"):
+    """ValueText (or ValueId) of one parameter, None if the product does not have it"""
+    for entry in self.parameters:
+      if entry[0] == parameterId:
+        return entry[1] if key == "ValueText" else entry[2] if key == "ValueId" else None
+    return None
+
+  def __repr__(self):
+    return f"ProductRecord({self.DigiKeyProductNumber or self.ManufacturerProductNumber}, {self.UnitPrice})"
+
+def digikeyPartNumber(product_json):
+  """Cut tape part number, else tape & reel, else the first variation"""
+  if isinstance(product_json, ProductRecord):
+    return product_json.DigiKeyProductNumber
+  variations = product_json.get("ProductVariations") or []
+  for packageId in (2, 1):
+    for variation in variations:
+      if (variation.get("PackageType") or {}).get("Id") == packageId and variation.get("DigiKeyProductNumber"):
+        return variation["DigiKeyProductNumber"]
+  if variations:
+    return variations[0].get("DigiKeyProductNumber")
+  return None
+
+def standardPricing(product_json):
+  """((BreakQuantity, UnitPrice), ...) of the DigiKey part number, ascending by quantity"""
+  if isinstance(product_json, ProductRecord):
+    return product_json.StandardPricing
+  partNumber = digikeyPartNumber(product_json)
+  for variation in product_json.get("ProductVariations") or ():
+    if variation.get("DigiKeyProductNumber") == partNumber:
+      return tuple(sorted((tier.get("BreakQuantity") or 0, tier.get("UnitPrice"))
+                          for tier in variation.get("StandardPricing") or () if tier.get("UnitPrice") is not None))
+  return ()
+
+def priceAt(product_json, quantity=1):
+  """
+  Unit price when ordering `quantity`: the price of the largest break at
+  or below it, the first break below the minimum order. UnitPrice at
+  quantity 1 or without price breaks.
+  """
+  if quantity <= 1:
+    return product_json.get("UnitPrice")
+  pricing = standardPricing(product_json)
+  if not pricing:
+    return product_json.get("UnitPrice")
+  price = pricing[0][1]
+  for breakQuantity, unitPrice in pricing:
+    if breakQuantity > quantity:
+      break
+    price = unitPrice
+  return price
+
+def withRanking(product_json, quantity, price, alternates):
+  """The product carrying the quantity and price it won at, and its alternates as ((price, product), ...)"""
+  if isinstance(product_json, ProductRecord):
+    product_json.OrderQuantity = quantity
+    product_json.OrderPrice = price
+    product_json.Alternates = tuple(alternates)
+    return product_json
+  return dict(product_json, OrderQuantity=quantity, OrderPrice=price, Alternates=tuple(alternates))
+
+def orderPrice(product_json):
+  """Price a selected product won at, UnitPrice unless it was ranked at an order quantity"""
+  price = product_json.get("OrderPrice")
+  return product_json.get("UnitPrice") if price is None else price
+
+def parameterIndex(product_json):
+  """ParameterId -> parameter entry, built in one pass over Parameters"""
+  if isinstance(product_json, ProductRecord):
+    return {parameterId: {"ValueText": text, "ValueId": valueId} for parameterId, text, valueId in product_json.parameters}
+  index = {}
+  for parameter in product_json.get("Parameters") or ():
+    index.setdefault(parameter.get("ParameterId"), parameter)
+  return index
+
+def parameterValue(product_json, parameterId, key="ValueText"):
+  """One value of one parameter of a product dict or record, None where it is missing"""
+  if isinstance(product_json, ProductRecord):
+    return product_json.parameter(parameterId, key)
+  return next((p.get(key) for p in product_json.get("Parameters") or () if p.get("ParameterId") == parameterId), None)
@@ -0,0 +1,61 @@
+# refresh.py
+import os
+import re
+from api_client import fetch_product_details
+from library import SymbolLibrary, symbolProperties, PRICE_QUANTITY
+from records import priceAt
+from settings import API_WORKERS
+
+_PRICE = re.compile(r'(\(property\s+"Price"\s+")((?:[^"\\]|\\.)*)(")')
+
+def refreshLibrary(path, workers=API_WORKERS):
+  """
+  Update the Price property of every symbol in an existing library, at
+  the order quantity in its Price Qty property, 1 without one.
+  The Digikey Part# of each symbol is looked up with a product details
+  request instead of crawling the whole category again, and only the
+  symbols whose price changed are rewritten.
+  Returns the number of symbols updated.
+  """
+  if not os.path.exists(path):
+    print(f"Library {path} does not exist, nothing to refresh")
+    return 0
+
+  library = SymbolLibrary(path, "", incremental=True)
+  library.keepExisting()
+  parts = {}
+  quantities = {}
+  for name, text in library.existing.items():
+    properties = symbolProperties(text)
+    part = properties.get("Digikey Part#")
+    if part and part != "N/A":
+      parts[name] = part
+      quantities[name] = int(properties.get(PRICE_QUANTITY) or 1)
+
+  details = fetch_product_details(parts.values(), workers)
+
+  unknown = set()
+  outOfStock = set()
+  for name, part in parts.items():
+    product = details.get(part)
+    if product is None:
+      unknown.add(part)
+      continue
+    if not product.get("QuantityAvailable"):
+      outOfStock.add(part)
+    price = priceAt(product, quantities[name])
+    if price is None:
+      continue
+
+    text = library.existing[name]
+    refreshed = _PRICE.sub(lambda match: f"{match.group(1)}{price}{match.group(3)}", text, count=1)
+    if refreshed != text:
+      library.unchanged -= 1
+      library.add(name, refreshed)
+
+  if unknown:
+    print(f"Not found at DigiKey: {', '.join(sorted(unknown))}")
+  if outOfStock:
+    print(f"Out of stock: {', '.join(sorted(outOfStock))}")
+  library.write()
+  return len(library.updated)
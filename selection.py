@@ -0,0 +1,84 @@
+# selection.py
+import heapq
+import math
+from records import priceAt, withRanking
+
+class CheapestSelector:
+  """
+  Single pass reducer that keeps the cheapest product per value group, and
+  with `keep` > 1 the runners-up ranked at `quantity` as its Alternates.
+  """
+  def __init__(self, groupKeys, sortedByPrice=False, keep=1, quantity=1):
+    self.groupKeys = groupKeys
+    # Search results are sorted by the quantity 1 price, which says nothing about other price breaks
+    self.sortedByPrice = sortedByPrice and quantity <= 1
+    self.keep = max(1, keep)
+    self.quantity = quantity
+    self.best = {}      # group key -> heap of (-price, -seen, product), the worst candidate first
+    self.closed = set()
+    self.seen = 0
+
+  def _price(self, product):
+    price = priceAt(product, self.quantity)
+    if price is None or (isinstance(price, float) and math.isnan(price)):
+      return None
+    return price
+
+  def add(self, product, key):
+    self.seen += 1
+    price = self._price(product)
+    if price is None or key in self.closed:
+      return
+    # Later products lose ties, so a candidate only replaces a strictly worse one
+    entry = (-price, -self.seen, product)
+    heap = self.best.get(key)
+    if heap is None:
+      self.best[key] = [entry]
+    elif len(heap) < self.keep:
+      heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+      heapq.heapreplace(heap, entry)
+
+  def _ranked(self, heap):
+    """Cheapest candidate of a group, carrying its order price and the others when ranked past the defaults"""
+    ranked = sorted(heap, reverse=True)
+    if self.keep == 1 and self.quantity <= 1:
+      return ranked[0][2]
+    return withRanking(ranked[0][2], self.quantity, -ranked[0][0],
+                       [(-negPrice, product) for negPrice, _, product in ranked[1:]])
+
+  def addPage(self, page):
+    """
+    Reduce one page. Returns the (key, product) pairs this page finalized,
+    which with `sortedByPrice` are the groups no later page can beat.
+    """
+    products = page.get("Products", ())
+    if not products:
+      return []
+    for product, key in zip(products, self.groupKeys(products)):
+      self.add(product, key)
+
+    if not self.sortedByPrice:
+      return []
+    prices = [price for price in map(self._price, products) if price is not None]
+    return self.finalize(min(prices)) if prices else []
+
+  def finalize(self, floor):
+    """
+    Close and return, ordered by key, the full groups whose worst kept
+    price is at most `floor`
+    """
+    ready = sorted(key for key, heap in self.best.items() if len(heap) == self.keep and -heap[0][0] <= floor)
+    for key in ready:
+      self.closed.add(key)
+    return [(key, self._ranked(self.best.pop(key))) for key in ready]
+
+  def finish(self):
+    """Close and return every group still open, ordered by key"""
+    ready = sorted(self.best)
+    self.closed.update(ready)
+    return [(key, self._ranked(self.best.pop(key))) for key in ready]
+
+  def selected(self):
+    """Cheapest product of every group, ordered by group key"""
+    return [self._ranked(self.best[key]) for key in sorted(self.best)]
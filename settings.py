@@ -1,5 +1,6 @@
 # settings.py
 # settings for the project
+import os
 
 padSize = 1.4
 
@@ -9,6 +10,60 @@ om = "\u03A9"
 # API Search Limits
 API_LIMIT = 50
 
+# Number of pages fetched at the same time
+API_WORKERS = 8
+
+# Request pacing and retries
+API_RATE_PER_MINUTE = 120   # DigiKey burst limit, corrected from response headers
+API_MAX_RETRIES = 5         # retries of a call failing with 429, 5xx, a connection error or a revoked token
+API_BACKOFF_BASE = 1.0      # seconds, doubled on every retry
+API_BACKOFF_MAX = 60.0      # seconds
+
+# Seconds before expiry at which the access token is refreshed
+TOKEN_REFRESH_MARGIN = 60
+
+# Value grouping, see values.py
+RESISTOR_SERIES = "E24"     # 5% resistors
+CAPACITOR_SERIES = "E12"    # 20% electrolytics
+SNAP_TOLERANCE = 0.005      # values this close (relative) to a series value share its group
+
+# Parts kept per value besides the cheapest, and the order quantity they are ranked at
+ALTERNATES = 0
+ORDER_QUANTITY = 1
+
+# Worker processes for parsing and rendering, used from this many selected products up.
+# A run selects a few hundred values at most, so --jobs only matters for bulk runs
+# such as a manifest of unfiltered searches, smaller runs render in-process
+JOBS = os.cpu_count() or 1
+PARALLEL_MIN_PRODUCTS = 2000
+# Products per chunk handed to a worker process while streaming
+STREAM_CHUNK = 64
+# Decode search responses incrementally while they are read (--streamDecode). Holds less
+# of a page in memory, but a whole-body decode with orjson is about twice as fast
+STREAM_DECODE = False
+# Bytes read at a time from a search response that is decoded incrementally
+STREAM_READ_BYTES = 64 * 1024
+# Products fetched per value by the query planner, more than one skips parts without a price
+PLAN_PER_VALUE = 5
+
+# Searches of a manifest crawled at the same time, see manifest.py
+MANIFEST_CONCURRENCY = 4
+
+# Watch mode, see watch.py
+WATCH_BUDGET = 30                 # API requests per cycle
+WATCH_STALE_AFTER = 24 * 60 * 60  # seconds before a value is checked again
+
+# Compiled Jinja templates, relative to the project folder
+TEMPLATE_CACHE_FOLDER = ".jinja_cache"
+
+# On-disk cache of API responses
+CACHE_FOLDER = ".digikey_cache"
+CACHE_TTL = 24 * 60 * 60          # seconds before a cached page is refetched
+CACHE_MAX_BYTES = 256 * 1024**2   # least recently used pages are removed past this
+
+# Local SQLite parts store, see partsdb.py
+DB_MAX_AGE = 24 * 60 * 60         # seconds before a synced search is synced again
+
 # Kicad Symbol Library Preamble
 resPreamble = '''(kicad_symbol_lib
 \t(version 20231120)
@@ -0,0 +1,42 @@
+# test_jsonstream.py
+import json
+import pytest
+from jsonstream import decodePage, loadPage
+
+PAGE = {
+  "ProductsCount": 12345,
+  "Products": [
+    {"Id": 1, "Tolerance": "±5%", "Value": "4.7 kΩ", "UnitPrice": 0.125},
+    {"Id": 2, "Capacitance": "100µF", "UnitPrice": 1e-3, "Note": "\U0001f50c"},
+    {"Id": 3, "UnitPrice": None, "Discontinued": True},
+  ],
+  "FilterOptions": {"Status": ["Active", "Obsolete"]},
+}
+RAW = json.dumps(PAGE, ensure_ascii=False).encode("utf-8")
+
+def _chunks(raw, size):
+  return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+def test_every_two_chunk_split():
+  for split in range(len(RAW) + 1):
+    assert decodePage([RAW[:split], RAW[split:]]) == PAGE, split
+
+def test_small_chunks_split_numbers_and_multibyte_characters():
+  for size in (1, 2, 3, 5, 7):
+    assert decodePage(_chunks(RAW, size)) == PAGE, size
+
+def test_transform_sees_each_product():
+  page = decodePage(_chunks(RAW, 4), transform=lambda product: product["Id"])
+  assert page["Products"] == [1, 2, 3]
+  assert page["ProductsCount"] == 12345
+
+def test_load_page_matches_incremental_decode():
+  transform = lambda product: product["Id"]
+  assert loadPage(RAW, transform) == decodePage(_chunks(RAW, 16), transform)
+
+def test_empty_products():
+  assert decodePage([b'{"Products": [', b' ], "ProductsCount": 0}']) == {"Products": [], "ProductsCount": 0}
+
+def test_truncated_body_raises():
+  with pytest.raises(ValueError):
+    decodePage(_chunks(RAW[:-20], 8))
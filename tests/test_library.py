@@ -0,0 +1,43 @@
+# test_library.py
+from library import readLibrary
+
+PREAMBLE = '(kicad_symbol_lib\n\t(version 20231120)\n\t(generator "test")\n'
+
+SYMBOL_ONE = ('\t(symbol "R_1 Ω"\n'
+              '\t\t(property "Value" "1 Ω")\n'
+              '\t\t(symbol "R_1 Ω_0_1"\n'
+              '\t\t\t(rectangle (start -1 2) (end 1 -2))\n'
+              '\t\t)\n'
+              '\t)\n')
+
+# Parens and escaped quotes inside strings must not move the symbol boundaries
+SYMBOL_TWO = ('\t(symbol "R_2 Ω"\n'
+              '\t\t(property "Description" "Resistor (5%) )) \\"axial\\" (")\n'
+              '\t\t(property "Value" "2 Ω")\n'
+              '\t)\n')
+
+def _library(tmp_path, text):
+  path = tmp_path / "test.kicad_sym"
+  path.write_text(text, encoding="utf-8")
+  return readLibrary(str(path))
+
+def test_splits_preamble_and_symbols(tmp_path):
+  preamble, symbols = _library(tmp_path, PREAMBLE + SYMBOL_ONE + SYMBOL_TWO + ")\n")
+  assert preamble == PREAMBLE
+  assert list(symbols) == ["R_1 Ω", "R_2 Ω"]
+  assert symbols["R_1 Ω"] == SYMBOL_ONE
+
+def test_strings_do_not_end_a_symbol(tmp_path):
+  _, symbols = _library(tmp_path, PREAMBLE + SYMBOL_TWO + SYMBOL_ONE + ")\n")
+  assert symbols["R_2 Ω"] == SYMBOL_TWO
+  assert symbols["R_1 Ω"] == SYMBOL_ONE
+
+def test_round_trip(tmp_path):
+  text = PREAMBLE + SYMBOL_ONE + SYMBOL_TWO + ")\n"
+  preamble, symbols = _library(tmp_path, text)
+  assert preamble + "".join(symbols.values()) + ")\n" == text
+
+def test_library_without_symbols(tmp_path):
+  preamble, symbols = _library(tmp_path, PREAMBLE + ")\n")
+  assert symbols == {}
+  assert preamble == PREAMBLE
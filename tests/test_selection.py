@@ -0,0 +1,50 @@
+# test_selection.py
+from records import ProductRecord
+from selection import CheapestSelector
+
+def groupKeys(products):
+  """Products "A1", "A2", ... belong to value group "A\""""
+  return [product.ManufacturerProductNumber[0] for product in products]
+
+def _product(mpn, price, pricing=()):
+  return ProductRecord(mpn, f"{mpn}-ND", "", price, pricing=pricing)
+
+def _page(*products):
+  return {"Products": list(products)}
+
+def _selected(pairs):
+  return [(key, product.ManufacturerProductNumber) for key, product in pairs]
+
+def test_sorted_pages_finalize_groups_nothing_later_can_beat():
+  selector = CheapestSelector(groupKeys, sortedByPrice=True)
+  assert _selected(selector.addPage(_page(_product("A1", 1.0), _product("B1", 2.0)))) == [("A", "A1")]
+  assert _selected(selector.addPage(_page(_product("C1", 3.0), _product("B2", 3.0)))) == [("B", "B1"), ("C", "C1")]
+  # Finalized groups are closed, a later product cannot reopen them
+  assert selector.addPage(_page(_product("A2", 0.5))) == []
+  assert selector.finish() == []
+
+def test_unsorted_pages_finalize_only_at_finish():
+  selector = CheapestSelector(groupKeys)
+  assert selector.addPage(_page(_product("A1", 2.0), _product("B1", None), _product("A2", 1.0))) == []
+  assert selector.addPage(_page(_product("A3", 1.0), _product("C1", 5.0))) == []
+  # Ties keep the product seen first, products without a price never win
+  assert _selected(selector.finish()) == [("A", "A2"), ("C", "C1")]
+
+def test_kept_alternates_finalize_once_the_group_is_full():
+  selector = CheapestSelector(groupKeys, sortedByPrice=True, keep=2)
+  assert selector.addPage(_page(_product("A1", 1.0), _product("A2", 1.5), _product("B1", 1.0))) == []
+  finalized = selector.addPage(_page(_product("C1", 2.0)))
+  assert _selected(finalized) == [("A", "A1")]
+  best = finalized[0][1]
+  assert best.OrderPrice == 1.0
+  assert [(price, alternate.ManufacturerProductNumber) for price, alternate in best.Alternates] == [(1.5, "A2")]
+  assert _selected(selector.finish()) == [("B", "B1"), ("C", "C1")]
+
+def test_order_quantity_ranks_by_price_break():
+  selector = CheapestSelector(groupKeys, sortedByPrice=True, quantity=100)
+  cheapOne = _product("A1", 1.0, pricing=((1, 1.0), (100, 0.8)))
+  cheapBulk = _product("A2", 1.2, pricing=((1, 1.2), (100, 0.5)))
+  # Search results are sorted by the quantity 1 price, so nothing is final early
+  assert selector.addPage(_page(cheapOne, cheapBulk)) == []
+  (key, best), = selector.finish()
+  assert (key, best.ManufacturerProductNumber, best.OrderQuantity, best.OrderPrice) == ("A", "A2", 100, 0.5)
@@ -0,0 +1,40 @@
+# test_values.py
+import math
+from values import INVALID_KEY, ZERO_KEY, parseValue, parseValues, seriesKeys
+
+def test_si_prefixes():
+  values = parseValues(["10 pF", "0.1 nF", "100mF", "4.7 kOhms", "2.2 KOhms", "1 MOhms", "1 mOhms"], "farad")
+  assert math.isclose(values[0], 10e-12)
+  assert math.isclose(values[1], 100e-12)
+  assert math.isclose(values[2], 0.1)
+  assert math.isclose(parseValue("4.7 kOhms", "ohm"), 4700)
+  assert math.isclose(parseValue("2.2 KOhms", "ohm"), 2200)
+  assert math.isclose(parseValue("1 MOhms", "ohm"), 1e6)
+  assert math.isclose(parseValue("1 mOhms", "ohm"), 1e-3)
+
+def test_micro_spellings():
+  # Micro sign U+00B5, Greek mu U+03BC and the ASCII fallback
+  values = parseValues(["100µF", "100μF", "100uF", "100 µF"], "farad")
+  assert all(math.isclose(value, 100e-6) for value in values)
+  assert len(set(seriesKeys(values, "E12"))) == 1
+
+def test_spellings_of_one_value_share_a_key():
+  keys = seriesKeys(parseValues(["4.7 kOhms", "4.70 kOhms", "4700 Ohms"], "ohm"))
+  assert list(keys) == [3470, 3470, 3470]
+
+def test_values_near_the_series_snap():
+  assert list(seriesKeys([4.69e3, 4.7e3 * (1 + 1e-12), 4.75e3])) == [3470, 3470, 3475]
+
+def test_mantissa_carries_into_the_next_decade():
+  assert list(seriesKeys([9.995, 10.0])) == [1100, 1100]
+
+def test_keys_sort_like_values():
+  values = [150e-12, 1e-9, 4.7, 47, 1e6]
+  keys = list(seriesKeys(values))
+  assert keys == sorted(keys)
+  assert keys[0] < 0
+
+def test_zero_and_unparsed_values():
+  keys = seriesKeys(parseValues(["0 Ohms", "n/a", "", None], "ohm"))
+  assert list(keys) == [ZERO_KEY, INVALID_KEY, INVALID_KEY, INVALID_KEY]
+  assert INVALID_KEY < ZERO_KEY < seriesKeys([1e-15])[0]
@@ -2,26 +2,132 @@
 import argparse
 import math
 import os
-from jinja2 import Environment, FileSystemLoader
+import re
+from settings import JOBS, API_WORKERS, API_RATE_PER_MINUTE, CACHE_FOLDER, CACHE_TTL, CACHE_MAX_BYTES, TEMPLATE_CACHE_FOLDER
+from settings import DB_MAX_AGE, PLAN_PER_VALUE, ALTERNATES, ORDER_QUANTITY, WATCH_BUDGET, WATCH_STALE_AFTER, STREAM_DECODE
+from metrics import metrics
 
-# Initialize Jinja2 environment loading from current directory
-env = Environment(loader=FileSystemLoader('.'))
+# Templates are found relative to the project, not the current directory
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
-def argumentParser():
+def _bytecodeCache():
+  """Persistent cache of compiled templates, None if its folder cannot be created"""
+  from jinja2 import FileSystemBytecodeCache
+  folder = os.path.join(PROJECT_ROOT, TEMPLATE_CACHE_FOLDER)
+  try:
+    os.makedirs(folder, exist_ok=True)
+  except OSError:
+    return None
+  return FileSystemBytecodeCache(folder)
+
+_env = None
+
+def environment():
+  """
+  Jinja2 environment, created on first use: templates that only substitute
+  plain fields never need it. Templates do not change during a run, so they
+  are compiled once and not checked for changes on every render.
+  """
+  global _env
+  if _env is None:
+    from jinja2 import Environment, FileSystemLoader
+    _env = Environment(loader=FileSystemLoader(PROJECT_ROOT), bytecode_cache=_bytecodeCache(), auto_reload=False)
+  return _env
+
+_templates = {}
+_renderers = {}
+
+_PLAIN_FIELD = re.compile(r"{{\s*([A-Za-z_]\w*)\s*}}")
+
+def _plainRenderer(source):
+  """
+  Fast path for templates that only substitute plain {{ name }} fields, like
+  the symbol templates: the text is split once and rendering is a join.
+  Returns None for templates using filters, tags or comments.
+  """
+  if "{%" in source or "{#" in source:
+    return None
+  parts = _PLAIN_FIELD.split(source)
+  literals = parts[0::2]
+  if any("{{" in literal for literal in literals):
+    return None
+  names = parts[1::2]
+  # Jinja drops a single trailing newline of the template
+  if literals[-1].endswith("\n"):
+    literals[-1] = literals[-1][:-1]
+
+  def render(data):
+    out = [literals[0]]
+    for name, literal in zip(names, literals[1:]):
+      out.append(str(data.get(name, "")))
+      out.append(literal)
+    return "".join(out)
+  return render
+
+def argumentParser(components=()):
+  """Command line arguments, `components` are the choices of --component"""
   cmdArg = argparse.ArgumentParser(description='Generate Kicad Symbols and Footprints from Digikey API.')
 
   # API specific arguments
   cmdArg.add_argument("--power", help="Power rating filter (e.g., 0.25W, 1/4W)", default="0.25W")
   cmdArg.add_argument("--limit", help="API fetch limit per batch", type=int, default=50)
   cmdArg.add_argument("--voltage", help="Voltage rating filter (e.g., 5v, 6.3v, 10v)", default = "6.3v")
+  cmdArg.add_argument("--workers", help="Number of pages fetched concurrently", type=int, default=API_WORKERS)
+  cmdArg.add_argument("--ratePerMinute", help="Maximum API calls per minute", type=int, default=API_RATE_PER_MINUTE)
+  cmdArg.add_argument("--tokenFile", default=None, help="Keep the access token in this file (mode 0600) so later runs reuse it")
+  cmdArg.add_argument("--streamDecode", action="store_true", default=STREAM_DECODE, help="Decode search pages while they are read, using less memory than a whole-page decode")
+  cmdArg.add_argument("--plan", action="store_true", help="Query each value on offer for its cheapest parts instead of crawling the category")
+  cmdArg.add_argument("--series", default=None, choices=("E6", "E12", "E24", "E96"), help="With --plan, only query the values of this E-series (e.g. E12)")
+  cmdArg.add_argument("--perValue", help="With --plan, products fetched per value", type=int, default=PLAN_PER_VALUE)
+  cmdArg.add_argument("--alternates", help="Runners-up per value written to each symbol as Alternate properties", type=int, default=ALTERNATES)
+  cmdArg.add_argument("--qty", help="Order quantity whose price-break price ranks the parts of a value", type=int, default=ORDER_QUANTITY)
+
+  # Response cache arguments
+  cmdArg.add_argument("--cacheFolder", default=CACHE_FOLDER, help="Folder for cached API responses")
+  cmdArg.add_argument("--cacheTTL", type=int, default=CACHE_TTL, help="Seconds before a cached response is refetched")
+  cmdArg.add_argument("--cacheMaxBytes", type=int, default=CACHE_MAX_BYTES, help="Size limit of the response cache")
+  cmdArg.add_argument("--noCache", action="store_true", help="Always fetch from the API and do not cache responses")
+  cmdArg.add_argument("--offline", action="store_true", help="Only use cached responses, fail on a cache miss")
+
+  # Parts store arguments
+  cmdArg.add_argument("--db", default=None, help="Keep fetched products in this SQLite file and select from it")
+  cmdArg.add_argument("--dbMaxAge", type=int, default=DB_MAX_AGE, help="Seconds before a search in --db is synced again, 0 always syncs")
+
   # Output arguments
   cmdArg.add_argument("--footFolder", default='.', help="Folder for generated footprints")
   cmdArg.add_argument("--sym", default="symbolLibrary.kicad_sym", help="Filename of the symbols library")
+  cmdArg.add_argument("--incremental", action="store_true", help="Only add, update or remove the symbols that changed in an existing library")
   
+  cmdArg.add_argument("--jobs", help="Worker processes for parsing and rendering, used once a run selects more than PARALLEL_MIN_PRODUCTS (settings.py) products", type=int, default=JOBS)
+
+  # Instrumentation
+  cmdArg.add_argument("--metricsJson", "--metrics-json", default=None, help="Write time, calls, bytes and memory per stage and per page to this JSON file")
+  cmdArg.add_argument("--profile", default=None, help="Write a cProfile dump of the run to this file")
+
   # Component type
-  cmdArg.add_argument("--component", required=True, help="Type of component: resistor, capTHRad, diode")
-  cmdArg.add_argument()
-  return cmdArg.parse_args()
+  cmdArg.add_argument("--component", choices=list(components) or None, help="Type of component")
+  cmdArg.add_argument("--refresh", action="store_true", help="Only update the prices of the symbols already in --sym")
+  cmdArg.add_argument("--manifest", default=None, help="Run every job of this JSON, TOML or YAML manifest")
+
+  # Watch mode
+  cmdArg.add_argument("--watch", type=float, default=None, metavar="SECONDS", help="Keep running and check stale values every SECONDS")
+  cmdArg.add_argument("--budget", type=int, default=WATCH_BUDGET, help="With --watch, API requests per check")
+  cmdArg.add_argument("--staleAfter", type=int, default=WATCH_STALE_AFTER, help="With --watch, seconds before a value is checked again")
+  cmdArg.add_argument("--statusPort", type=int, default=None, help="With --watch, serve /status and /metrics on this localhost port")
+  args = cmdArg.parse_args()
+  if args.component is None and not (args.refresh or args.manifest):
+    cmdArg.error("--component is required unless --refresh or --manifest is given")
+  if args.manifest and (args.plan or args.db or args.series):
+    cmdArg.error("--manifest crawls the search of each job, it cannot be combined with --plan, --db or --series")
+  if args.plan and args.db:
+    cmdArg.error("--plan selects on the server, it cannot be combined with --db")
+  if args.watch is not None and (args.manifest or args.refresh or args.db or args.offline or args.component is None):
+    cmdArg.error("--watch keeps one --component library current, without --manifest, --refresh, --db or --offline")
+  if args.refresh and args.offline:
+    cmdArg.error("--refresh asks DigiKey for current prices, it cannot be combined with --offline")
+  if args.budget < 2:
+    cmdArg.error("--budget must be at least 2, one request lists the values and one checks a value")
+  return args
 
 def grid_round_up(a):
   """
@@ -29,17 +135,56 @@ def grid_round_up(a):
   """
   return math.ceil(a/2.54)*2.54
 
+def templatePath(pathToTemplate):
+  """Absolute path of a template given relative to the project"""
+  return os.path.join(PROJECT_ROOT, pathToTemplate)
+
+def get_template(pathToTemplate):
+  """Compiled template, loaded once per run"""
+  if pathToTemplate not in _templates:
+    _templates[pathToTemplate] = environment().get_template(pathToTemplate)
+  return _templates[pathToTemplate]
+
+def get_renderer(pathToTemplate):
+  """Function rendering a data dict with the template, the fast path when it applies"""
+  if pathToTemplate not in _renderers:
+    with open(templatePath(pathToTemplate), "r", encoding="utf-8") as file:
+      source = file.read()
+    _renderers[pathToTemplate] = _plainRenderer(source) or get_template(pathToTemplate).render
+  return _renderers[pathToTemplate]
+
 def render_template(pathToTemplate, data):
   """
   Fills in the template and render with Jinja2
   """
   try:
-    template = env.get_template(pathToTemplate)
-    return template.render(data)
+    return get_renderer(pathToTemplate)(data)
   except Exception as e:
     print(f"Error rendering template {pathToTemplate}: {e}")
     return ""
 
+def render_templates(pathToTemplate, dataList):
+  """
+  Render one template for many data dicts, returns the texts in order.
+  The template is looked up once for the whole batch.
+  """
+  try:
+    render = get_renderer(pathToTemplate)
+  except Exception as e:
+    print(f"Error loading template {pathToTemplate}: {e}")
+    return ["" for _ in dataList]
+
+  outputs = []
+  with metrics.stage("render") as stage:
+    for data in dataList:
+      try:
+        outputs.append(render(data))
+      except Exception as e:
+        print(f"Error rendering template {pathToTemplate}: {e}")
+        outputs.append("")
+    stage["bytes"] = sum(len(output) for output in outputs)
+  return outputs
+
 def checkForFootprint(fileName, pathToFootprint):
   """
   Checks if footprint already exist.
@@ -0,0 +1,126 @@
+# values.py
+# Batched parsing of engineering values ("4.7 kOhms", "100µF", "6.3 V") and E-series grouping
+import re
+import numpy as np
+from settings import SNAP_TOLERANCE
+
+# SI prefix multipliers, "u" and both micro signs are accepted
+SI_PREFIX = {
+  "p": 1e-12, "n": 1e-9, "u": 1e-6, "µ": 1e-6, "μ": 1e-6,
+  "m": 1e-3, "": 1.0, "k": 1e3, "K": 1e3, "M": 1e6, "G": 1e9,
+}
+
+# Unit spellings DigiKey uses, per quantity
+UNITS = {
+  "ohm": r"(?i:ohms?)|Ω",
+  "farad": r"F",
+  "volt": r"V",
+  "watt": r"W",
+}
+
+# Series mantissas as 3 significant digits, 100 to 999
+E_SERIES = {
+  "E6": (100, 150, 220, 330, 470, 680),
+  "E12": (100, 120, 150, 180, 220, 270, 330, 390, 470, 560, 680, 820),
+  "E24": (100, 110, 120, 130, 150, 160, 180, 200, 220, 240, 270, 300,
+          330, 360, 390, 430, 470, 510, 560, 620, 680, 750, 820, 910),
+  "E96": (100, 102, 105, 107, 110, 113, 115, 118, 121, 124, 127, 130,
+          133, 137, 140, 143, 147, 150, 154, 158, 162, 165, 169, 174,
+          178, 182, 187, 191, 196, 200, 205, 210, 215, 221, 226, 232,
+          237, 243, 249, 255, 261, 267, 274, 280, 287, 294, 301, 309,
+          316, 324, 332, 340, 348, 357, 365, 374, 383, 392, 402, 412,
+          422, 432, 442, 453, 464, 475, 487, 499, 511, 523, 536, 549,
+          562, 576, 590, 604, 619, 634, 649, 665, 681, 698, 715, 732,
+          750, 768, 787, 806, 825, 845, 866, 887, 909, 931, 953, 976),
+}
+
+# Group keys of values that are zero (jumpers) or could not be parsed, below every real value
+ZERO_KEY = -(1 << 62)
+INVALID_KEY = ZERO_KEY - 1
+
+_PATTERNS = {}
+
+def _pattern(unit):
+  """One line per value: either a number, prefix and unit, or anything else"""
+  if unit not in _PATTERNS:
+    prefixes = "".join(re.escape(p) for p in SI_PREFIX if p)
+    _PATTERNS[unit] = re.compile(
+      rf"^[ \t]*(?:(\d+(?:\.\d*)?|\.\d+)[ \t]*([{prefixes}]?)(?:{UNITS[unit]})\b[^\n]*|[^\n]*)$",
+      re.MULTILINE)
+  return _PATTERNS[unit]
+
+def _parseDistinct(texts, unit):
+  """Parse distinct strings with one regex pass over their joined text"""
+  numbers, prefixes = zip(*_pattern(unit).findall("\n".join(t.replace("\n", " ") for t in texts)))
+  values = np.array([float(n) if n else np.nan for n in numbers])
+  return values * np.array([SI_PREFIX[p] for p in prefixes])
+
+def parseValues(texts, unit):
+  """
+  Convert a column of SI-prefixed strings to a float array in base units.
+  A catalog column repeats a few hundred distinct strings, so each distinct
+  string is parsed once and the column is filled with one NumPy gather.
+  Values that do not parse are NaN.
+  """
+  distinct = {}
+  rows = np.fromiter((distinct.setdefault("" if t is None else str(t), len(distinct)) for t in texts),
+                     dtype=np.intp)
+  if not distinct:
+    return np.empty(0)
+  return _parseDistinct(list(distinct), unit)[rows]
+
+def parseValue(text, unit):
+  """Single value version of parseValues, NaN when the text does not parse"""
+  return float(parseValues([text], unit)[0])
+
+def _decompose(values):
+  """Split positive values into decade and mantissa in [1, 10)"""
+  values = np.asarray(values, dtype=float)
+  valid = np.isfinite(values) & (values > 0)
+  logs = np.log10(np.where(valid, values, 1.0))
+  decade = np.floor(logs).astype(np.int64)
+  return values, valid, decade, logs - decade
+
+def _nearest(logMantissa, series):
+  """Index into the series (one past the end means 10 of this decade) and log distance"""
+  table = np.log10(np.append(np.array(E_SERIES[series], dtype=float), 1000.0) / 100.0)
+  upper = np.clip(np.searchsorted(table, logMantissa), 1, len(table) - 1)
+  lower = upper - 1
+  useUpper = (table[upper] - logMantissa) < (logMantissa - table[lower])
+  index = np.where(useUpper, upper, lower)
+  return index, np.abs(table[index] - logMantissa)
+
+def seriesIndex(values, series="E24", tolerance=SNAP_TOLERANCE):
+  """
+  Position of each value in the E-series as decade * len(series) + index, so
+  4.7k in E24 is 3 * 24 + 16. Values further than `tolerance` (relative) from
+  every series value, zero or NaN give INVALID_KEY.
+  """
+  values, valid, decade, logMantissa = _decompose(values)
+  index, distance = _nearest(logMantissa, series)
+  size = len(E_SERIES[series])
+  positions = (decade + index // size) * size + index % size
+  snapped = valid & (distance <= np.log10(1 + tolerance))
+  return np.where(snapped, positions, INVALID_KEY)
+
+def seriesKeys(values, series="E24", tolerance=SNAP_TOLERANCE):
+  """
+  Exact integer group key per value: decade * 1000 plus the mantissa to three
+  significant digits. Values within `tolerance` of a series value take the
+  series mantissa, so float noise and spellings like "4.7k" and "4.70 k"
+  always share a key. Keys sort in the same order as the values.
+  """
+  values, valid, decade, logMantissa = _decompose(values)
+  mantissa = np.rint(10 ** logMantissa * 100).astype(np.int64)
+
+  index, distance = _nearest(logMantissa, series)
+  table = np.append(np.array(E_SERIES[series], dtype=np.int64), 1000)
+  snapped = distance <= np.log10(1 + tolerance)
+  mantissa = np.where(snapped, table[index], mantissa)
+
+  # 9.995 rounds up to the first value of the next decade
+  carry = mantissa >= 1000
+  keys = (decade + carry) * 1000 + np.where(carry, 100, mantissa)
+
+  keys = np.where(values == 0, ZERO_KEY, keys)
+  return np.where(valid | (values == 0), keys, INVALID_KEY)
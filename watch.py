@@ -0,0 +1,198 @@
+# watch.py
+# Long running mode: keep one library current with a steady trickle of API calls
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from api_client import cheapestOfValue, getClient, valueGroups
+from components import COMPONENTS
+from footprints import FootprintManager
+from library import SymbolLibrary
+from metrics import metrics
+from pipeline import generate
+from records import digikeyPartNumber, orderPrice
+
+def _fingerprint(product):
+  """What a symbol shows of a selected product, a change means the symbol is rewritten"""
+  alternates = tuple((price, digikeyPartNumber(alternate)) for price, alternate in product.get("Alternates") or ())
+  return (digikeyPartNumber(product), orderPrice(product), alternates)
+
+class LibraryWatcher:
+  """
+  Keeps one library current by re-querying the value groups checked longest
+  ago, at most `budget` requests per cycle, and rewriting changed symbols.
+  """
+  def __init__(self, args):
+    if args.component not in COMPONENTS:
+      raise RuntimeError(f"--watch supports {', '.join(COMPONENTS)}, not {args.component}")
+    kind = COMPONENTS[args.component]
+    parts = kind.load()
+    self.componentClass, self.preamble, self.groupSeries = parts.componentClass, parts.preamble, parts.groupSeries
+    self.parameterId, self.unit = kind.valueParameter, kind.unit
+    self.search = parts.search(getattr(args, kind.rating))
+    self.args = args
+    self.budget = args.budget
+    self.staleAfter = args.staleAfter
+    self.index = {}       # group key -> selected product
+    self.valueIds = {}    # group key -> ValueIds queried for the group
+    self.checked = {}     # group key -> time of the last query
+    self.listed = 0.0     # time the values on offer were last listed
+    self.footprints = FootprintManager(args.footFolder)
+    self.cycles = 0
+    self.requests = 0
+    self.changes = 0
+    self.lastCycle = None
+    self.nextCycle = None
+    self._lock = threading.Lock()
+
+  def _list(self):
+    """List the values on offer, new groups are queried first and withdrawn ones dropped"""
+    groups = valueGroups(self.search, self.parameterId, self.unit, self.groupSeries, self.args.series)
+    self.requests += 1
+    self.listed = time.time()
+    with self._lock:
+      withdrawn = [key for key in self.index if key not in groups]
+      for key in set(self.valueIds) - set(groups):
+        self.index.pop(key, None)
+        self.checked.pop(key, None)
+      self.valueIds = groups
+    return bool(withdrawn)
+
+  def _query(self, keys):
+    """Query `keys` concurrently, returns True if any selection changed"""
+    args = self.args
+    def cheapest(key):
+      return key, cheapestOfValue(self.search, self.parameterId, key, self.valueIds[key],
+                                  args.perValue, args.alternates, args.qty)
+
+    changed = False
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+      for key, selected in pool.map(cheapest, keys):
+        self.requests += 1
+        with self._lock:
+          self.checked[key] = time.time()
+          old = self.index.get(key)
+          if not selected:
+            changed |= self.index.pop(key, None) is not None
+            continue
+          product = selected[0][1]
+          self.index[key] = product
+          if old is None or _fingerprint(old) != _fingerprint(product):
+            changed = True
+            self.changes += 1
+    return changed
+
+  def _write(self):
+    """Regenerate the library from the index, only changed symbols are rendered"""
+    with self._lock:
+      selected = sorted(self.index.items())
+    library = SymbolLibrary(self.args.sym, self.preamble, incremental=True)
+    generate(self.componentClass, selected, library, self.footprints, self.args.jobs)
+    library.write()
+    self.footprints.save()
+
+  def sync(self):
+    """First full selection of every value group"""
+    self._list()
+    self._query(list(self.valueIds))
+    self._write()
+    self.changes = 0
+
+  def cycle(self):
+    """Refresh the stalest value groups within the request budget"""
+    start = time.time()
+    budget = self.budget
+    changed = False
+    if start - self.listed >= self.staleAfter and all(self.checked.get(key, 0.0) > self.listed for key in self.valueIds):
+      changed |= self._list()
+      budget -= 1
+
+    with self._lock:
+      due = sorted((self.checked.get(key, 0.0), key) for key in self.valueIds
+                   if start - self.checked.get(key, 0.0) >= self.staleAfter)
+    keys = [key for _, key in due[:budget]]
+    if keys:
+      changed |= self._query(keys)
+    if changed:
+      self._write()
+    metrics.clearPages()
+
+    self.cycles += 1
+    self.lastCycle = {"started": start, "seconds": time.time() - start, "queried": len(keys), "changed": changed}
+    print(f"Cycle {self.cycles}: {len(keys)} of {len(due)} stale values checked, "
+          f"{'library updated' if changed else 'no changes'}")
+
+  def status(self):
+    """State of the watcher for the status endpoint"""
+    now = time.time()
+    with self._lock:
+      stale = sum(1 for key in self.valueIds if now - self.checked.get(key, 0.0) >= self.staleAfter)
+      oldest = min(self.checked.values(), default=None)
+      return {
+        "component": self.args.component,
+        "library": self.args.sym,
+        "groups": len(self.valueIds),
+        "selected": len(self.index),
+        "stale": stale,
+        "oldestCheck": None if oldest is None else now - oldest,
+        "cycles": self.cycles,
+        "requests": self.requests,
+        "changes": self.changes,
+        "lastCycle": self.lastCycle,
+        "nextCycle": None if self.nextCycle is None else max(0.0, self.nextCycle - now),
+        "scheduler": getClient().scheduler.report(),
+      }
+
+def _statusServer(watcher, port):
+  """Serve /status and /metrics as JSON on localhost from a background thread"""
+  class Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+      pass
+
+    def do_GET(self):
+      if self.path in ("/", "/status"):
+        body = watcher.status()
+      elif self.path == "/metrics":
+        body = {name: value for name, value in metrics.report().items() if name != "pages"}
+      else:
+        self.send_error(404)
+        return
+      content = json.dumps(body, indent=1).encode("utf-8")
+      self.send_response(200)
+      self.send_header("Content-Type", "application/json")
+      self.send_header("Content-Length", str(len(content)))
+      self.end_headers()
+      self.wfile.write(content)
+
+  server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+  server.daemon_threads = True
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  host, port = server.server_address[:2]
+  print(f"Status on http://{host}:{port}/status")
+  return server
+
+def watchLibrary(args, cycles=None):
+  """
+  Run a LibraryWatcher every --watch seconds until interrupted, or for
+  `cycles` cycles after the first sync
+  """
+  metrics.enable()
+  watcher = LibraryWatcher(args)
+  server = _statusServer(watcher, args.statusPort) if args.statusPort is not None else None
+  try:
+    watcher.sync()
+    while cycles is None or watcher.cycles < cycles:
+      watcher.nextCycle = time.time() + args.watch
+      time.sleep(args.watch)
+      try:
+        watcher.cycle()
+      except RuntimeError as e:
+        print(f"Cycle failed, retrying next cycle: {e}")
+  except KeyboardInterrupt:
+    print("Stopped.")
+  finally:
+    if server is not None:
+      server.shutdown()
+      server.server_close()
+  return watcher